@@ -32,6 +32,41 @@ async def run_app(packages, port):
 	if not Config.realm:
 		del Config.modules['realm']
 	await Config.config_data()
+	# [DOC] Start extn cache invalidation change streams for modules opting in
+	extn_cache_collections = []
+	for module in Config.modules.values():
+		if (
+			module.extn_cache
+			and module.collection
+			and module.collection not in extn_cache_collections
+		):
+			extn_cache_collections.append(module.collection)
+			asyncio.create_task(
+				Data.extn_cache_watch(env=Config._sys_env, collection=module.collection)
+			)
+	# [DOC] Start __deleted flag migration for all collections in background
+	deleted_flag_collections = []
+	for module in Config.modules.values():
+		if module.collection and module.collection not in deleted_flag_collections:
+			deleted_flag_collections.append(module.collection)
+			asyncio.create_task(
+				Data.migrate_deleted_flag(
+					env=Config._sys_env, collection=module.collection
+				)
+			)
+	# [DOC] Start access principals migration for collections of modules with ACCESS attrs in background
+	for module in Config.modules.values():
+		if module.collection and any(
+			attr._type == 'ACCESS' for attr in module.attrs.values()
+		):
+			asyncio.create_task(
+				Data.migrate_access_principals(
+					env=Config._sys_env, collection=module.collection, attrs=module.attrs
+				)
+			)
+	# [DOC] Start index advisor to create advised indexes in background, if opted in
+	if Config.data_index_advisor and Config.data_index_advisor_create:
+		asyncio.create_task(Data.index_advisor_create(env=Config._sys_env))
 	# [DOC] Populate get_routes, post_routes
 	get_routes = []
 	post_routes = []
@@ -354,12 +389,19 @@ async def run_app(packages, port):
 			except:
 				doc = {}
 
+		query = [request_args]
+		# [DOC] Check for NDJSON accept header to stream results
+		if 'accept' in request.headers and 'application/x-ndjson' in request.headers['accept']:
+			query.append({'$stream': True})
+
 		results = await Config.modules[module].methods[method](
-			env=env, query=[request_args], doc=doc
+			env=env, query=query, doc=doc
 		)
 
-		logger.debug('Closing connection.')
-		env['conn'].close()
+		# [DOC] Streams read from connection while response is written, close it afterwards
+		if 'return' not in results.args or results.args['return'] != 'stream':
+			logger.debug('Closing connection.')
+			env['conn'].close()
 
 		if 'return' not in results.args or results.args['return'] == 'json':
 			if 'return' in results.args:
@@ -399,6 +441,56 @@ async def run_app(packages, port):
 			return aiohttp.web.Response(
 				status=results.status, headers=headers, body=results.msg
 			)
+		elif results.args['return'] == 'stream':
+			stream = results.args['stream']
+			try:
+				# [DOC] Check first batch for error results before sending stream headers
+				try:
+					stream_results = await stream.__anext__()
+				except StopAsyncIteration:
+					stream_results = None
+				if stream_results and stream_results['status'] != 200:
+					headers.append(('Content-Type', 'application/json; charset=utf-8'))
+					return aiohttp.web.Response(
+						status=stream_results['status'],
+						headers=headers,
+						body=JSONEncoder().encode(stream_results),
+					)
+				headers.append(('Content-Type', 'application/x-ndjson; charset=utf-8'))
+				response = aiohttp.web.StreamResponse(status=200, headers=headers)
+				response.enable_chunked_encoding()
+				await response.prepare(request)
+				try:
+					while stream_results:
+						await response.write(
+							''.join(
+								JSONEncoder().encode(doc) + '\n'
+								for doc in stream_results['args']['docs']
+							).encode('utf-8')
+						)
+						try:
+							stream_results = await stream.__anext__()
+						except StopAsyncIteration:
+							stream_results = None
+				except Exception as e:
+					logger.error(f'Failed to stream results. Details: {traceback.format_exc()}.')
+					await response.write(
+						(
+							JSONEncoder().encode(
+								{
+									'status': 500,
+									'msg': 'Unexpected error has occured.',
+									'args': {'code': 'CORE_SERVER_ERROR'},
+								}
+							)
+							+ '\n'
+						).encode('utf-8')
+					)
+				await response.write_eof()
+				return response
+			finally:
+				logger.debug('Closing connection.')
+				env['conn'].close()
 
 		headers.append(('Content-Type', 'application/json; charset=utf-8'))
 		return aiohttp.web.Response(
@@ -11,6 +11,7 @@ from classes import (
 )
 from enums import Event, LIMP_VALUES
 from config import Config
+from data import Data
 
 from asyncio import coroutine
 from aiohttp.web import WebSocketResponse
@@ -20,6 +21,9 @@ import logging, copy, traceback, sys, asyncio
 
 logger = logging.getLogger('limp')
 
+# [DOC] Placeholder value of docs of watch results, replaced with docs encoded once by shared change stream
+WATCH_DOCS_PLACEHOLDER = '__WATCH_DOCS__'
+
 
 class BaseMethod:
 	def __init__(
@@ -32,6 +36,7 @@ class BaseMethod:
 		watch_method: bool,
 		get_method: bool,
 		post_method: bool,
+		read_preference: str = None,
 	):
 		self.module = module
 		self.method = method
@@ -41,6 +46,7 @@ class BaseMethod:
 		self.watch_method = watch_method
 		self.get_method = get_method
 		self.post_method = post_method
+		self.read_preference = read_preference
 
 	def validate_args(self, args: Dict[str, Any], args_list: str):
 		args_list_label = args_list
@@ -103,6 +109,34 @@ class BaseMethod:
 		query: Union[LIMP_QUERY, Query] = None,
 		doc: LIMP_DOC = None,
 		call_id: str = None,
+	) -> DictObj:
+		# [DOC] Set call context for Data calls, and reset it once method returns, so nested calls don't leak into caller context
+		# [DOC] Only read, watch methods use read preference. Reads of other methods, such as read-before-write, stay on primary
+		read_method = self.method == 'read' or self.watch_method
+		call_ctx_token = Data.set_call_ctx(
+			module=self.module.module_name,
+			method=self.method,
+			call_id=call_id,
+			read_preference=(self.read_preference or self.module.read_preference)
+			if read_method
+			else 'primary',
+			read_method=read_method,
+		)
+		try:
+			return await self._call(
+				skip_events=skip_events, env=env, query=query, doc=doc, call_id=call_id
+			)
+		finally:
+			Data.reset_call_ctx(token=call_ctx_token)
+
+	async def _call(
+		self,
+		*,
+		skip_events: List[Event] = None,
+		env: Dict[str, Any] = None,
+		query: Union[LIMP_QUERY, Query] = None,
+		doc: LIMP_DOC = None,
+		call_id: str = None,
 	) -> DictObj:
 		if skip_events == None:
 			skip_events = []
@@ -220,6 +254,20 @@ class BaseMethod:
 					if doc[attr] != LIMP_VALUES.NONE_VALUE
 				}
 
+		# [DOC] For create_many, distribute top-level doc attrs, such as realm, permissions doc args onto every doc in batch
+		if self.method == 'create_many' and 'docs' in doc.keys() and type(doc['docs']) == list:
+			batch_attrs = {attr: doc[attr] for attr in doc.keys() if attr != 'docs'}
+			doc['docs'] = [
+				{**create_doc, **batch_attrs} if type(create_doc) == dict else create_doc
+				for create_doc in doc['docs']
+			]
+		# [DOC] For update_many, distribute top-level doc attrs onto doc of every update in batch
+		elif self.method == 'update_many' and 'docs' in doc.keys() and type(doc['docs']) == list:
+			batch_attrs = {attr: doc[attr] for attr in doc.keys() if attr != 'docs'}
+			for update in doc['docs']:
+				if type(update) == dict and type(update.get('doc')) == dict:
+					update['doc'].update(batch_attrs)
+
 		if Event.ARGS not in skip_events:
 			if self.query_args:
 				test_query = self.validate_args(query, 'query')
@@ -299,6 +347,31 @@ class BaseMethod:
 			skip_events.append(Event.EXTN)
 			del query['$extn']
 
+		# [DOC] check if $stream oper is set to stream read results in batches
+		stream_batch = None
+		if '$stream' in query:
+			if self.method == 'read' and query['$stream']:
+				stream_batch = Config.data_stream_batch
+				if type(query['$stream']) == int and query['$stream'] > 0:
+					stream_batch = query['$stream']
+			del query['$stream']
+
+		# [DOC] check if $coalesce oper is set to batch watch events in windows
+		coalesce = None
+		if '$coalesce' in query:
+			if self.watch_method and query['$coalesce']:
+				coalesce = {'window': 0, 'size': Config.data_watch_coalesce_size}
+				if type(query['$coalesce']) == int and query['$coalesce'] > 0:
+					coalesce['window'] = query['$coalesce']
+				elif type(query['$coalesce']) == dict:
+					for coalesce_opt in ['window', 'size']:
+						if (
+							type(query['$coalesce'].get(coalesce_opt)) == int
+							and query['$coalesce'][coalesce_opt] > 0
+						):
+							coalesce[coalesce_opt] = query['$coalesce'][coalesce_opt]
+			del query['$coalesce']
+
 		try:
 			# [DOC] Check for proxy module
 			if self.module.proxy:
@@ -335,11 +408,87 @@ class BaseMethod:
 					stream=env['watch_tasks'][call_id]['watch'],
 					call_id=call_id,
 					watch_task=env['watch_tasks'][call_id],
+					coalesce=coalesce,
 				)  # pylint: disable=assignment-from-no-return
 				env['watch_tasks'][call_id]['task'] = asyncio.create_task(
 					env['watch_tasks'][call_id]['watch']
 				)
 				return
+			elif stream_batch:
+				stream = self.module.read_stream(
+					skip_events=skip_events,
+					env=env,
+					query=query,
+					doc=doc,
+					batch_size=stream_batch,
+				)
+				# [DOC] Drain stream for test calls, so tests get all docs in one results dict
+				if call_id == '__TEST__':
+					stream_docs = []
+					async for results in stream:
+						results = DictObj(results)
+						results['args'] = DictObj(results.args)
+						if results.status != 200:
+							return await self.return_results(
+								ws=env['ws'], results=results, call_id=call_id
+							)
+						stream_docs += results.args.docs
+					return await self.return_results(
+						ws=env['ws'],
+						results=DictObj(
+							{
+								'status': 200,
+								'msg': f'Streamed {len(stream_docs)} docs.',
+								'args': DictObj(
+									{
+										'code': 'CORE_STREAM_END',
+										'count': len(stream_docs),
+										'docs': stream_docs,
+									}
+								),
+							}
+						),
+						call_id=call_id,
+					)
+				# [DOC] Return stream generator for http_handler to write results as NDJSON
+				if not call_id:
+					return await self.return_results(
+						ws=env['ws'],
+						results=DictObj(
+							{
+								'status': 200,
+								'msg': 'Created stream.',
+								'args': DictObj({'return': 'stream', 'stream': stream}),
+							}
+						),
+						call_id=call_id,
+					)
+				# [DOC] Send every batch as separate message under same call_id
+				stream_count = 0
+				async for results in stream:
+					results = DictObj(results)
+					results['args'] = DictObj(results.args)
+					if results.status != 200:
+						return await self.return_results(
+							ws=env['ws'], results=results, call_id=call_id
+						)
+					stream_count += results.args.count
+					await self.return_results(
+						ws=env['ws'], results=results, call_id=call_id
+					)
+				return await self.return_results(
+					ws=env['ws'],
+					results=DictObj(
+						{
+							'status': 200,
+							'msg': f'Streamed {stream_count} docs.',
+							'args': DictObj(
+								{'code': 'CORE_STREAM_END', 'count': stream_count}
+							),
+						}
+					),
+					call_id=call_id,
+				)
 			else:
 				results = await method(
 					skip_events=skip_events, env=env, query=query, doc=doc
@@ -426,8 +575,16 @@ class BaseMethod:
 		stream: AsyncGenerator,
 		call_id: str,
 		watch_task: Dict[str, Any],
+		coalesce: Dict[str, int] = None,
 	):
 		logger.debug('Preparing async loop at BaseMethod')
+		if coalesce:
+			stream = self.coalesce_loop(
+				stream=stream,
+				watch_task=watch_task,
+				window=coalesce['window'],
+				size=coalesce['size'],
+			)
 		async for results in stream:
 			logger.debug(f'Received watch results at BaseMethod: {results}')
 			# [DOC] Update watch_task stream value with stream object
@@ -435,6 +592,11 @@ class BaseMethod:
 				watch_task['stream'] = results['stream']
 				continue
 
+			# [DOC] Docs of shared change stream are encoded once for all subscribers, and spliced into message
+			docs_encoded = None
+			if type(results.get('args')) == dict:
+				docs_encoded = results['args'].pop('__docs_encoded', None)
+
 			results = DictObj(results)
 			try:
 				results['args'] = DictObj(results.args)
@@ -444,6 +606,165 @@ class BaseMethod:
 			results.args['call_id'] = call_id
 			results.args['watch'] = call_id
 
+			if docs_encoded:
+				results.args['docs'] = WATCH_DOCS_PLACEHOLDER
+				await ws.send_str(
+					JSONEncoder()
+					.encode(results)
+					.replace(JSONEncoder().encode(WATCH_DOCS_PLACEHOLDER), docs_encoded, 1)
+				)
+				continue
+
 			await ws.send_str(JSONEncoder().encode(results))
 
 		logger.debug('Generator ended at BaseMethod.')
+
+	async def coalesce_loop(
+		self,
+		stream: AsyncGenerator,
+		watch_task: Dict[str, Any],
+		window: int,
+		size: int,
+	):
+		# [DOC] Read stream in separate task, so window timeout doesn't cancel stream generator
+		queue = asyncio.Queue()
+
+		async def read_stream():
+			try:
+				async for results in stream:
+					if 'stream' in results.keys():
+						watch_task['stream'] = results['stream']
+						continue
+					# [DOC] Docs of shared change stream are copied, as coalesced docs are merged in place
+					if type(results.get('args')) == dict and results['args'].pop(
+						'__docs_encoded', None
+					):
+						results['args']['docs'] = copy.deepcopy(results['args']['docs'])
+					await queue.put(results)
+			finally:
+				queue.put_nowait(None)
+
+		def is_event(results: Dict[str, Any]) -> bool:
+			return (
+				results['status'] == 200
+				and 'docs' in results['args'].keys()
+				and 'oper' in results['args'].keys()
+			)
+
+		read_task = asyncio.create_task(read_stream())
+		loop = asyncio.get_event_loop()
+		pending = None
+		try:
+			while True:
+				if pending:
+					results, pending = pending, None
+				else:
+					results = await queue.get()
+				if results == None:
+					break
+				# [DOC] Non-event results, such as errors and resync signals, are sent as-is
+				if not is_event(results):
+					yield results
+					continue
+				batch = [results]
+				batch_count = len(results['args']['docs'])
+				deadline = loop.time() + (window / 1000)
+				ended = False
+				while batch_count < size:
+					timeout = deadline - loop.time()
+					if timeout <= 0:
+						break
+					try:
+						results = await asyncio.wait_for(queue.get(), timeout=timeout)
+					except asyncio.TimeoutError:
+						break
+					if results == None:
+						ended = True
+						break
+					if not is_event(results):
+						pending = results
+						break
+					batch.append(results)
+					batch_count += len(results['args']['docs'])
+				coalesce_results = self.coalesce_results(batch=batch)
+				if coalesce_results:
+					yield coalesce_results
+				if ended:
+					break
+		finally:
+			read_task.cancel()
+
+	def coalesce_delta(
+		self, *, doc: BaseModel, delta: BaseModel, full: bool
+	) -> BaseModel:
+		doc = doc._attrs()
+		delta = delta._attrs()
+		if not full and '__from_version' not in doc.keys():
+			doc['__from_version'] = doc['__version']
+		unset_attrs = [
+			attr for attr in doc.get('__unset', []) if attr not in delta.keys()
+		]
+		for attr in delta.keys():
+			if attr == '__unset':
+				continue
+			doc[attr] = delta[attr]
+		for attr in delta.get('__unset', []):
+			if attr in doc.keys():
+				del doc[attr]
+			if attr not in unset_attrs:
+				unset_attrs.append(attr)
+		# [DOC] Full doc has unset attrs removed already
+		if unset_attrs and not full:
+			doc['__unset'] = unset_attrs
+		elif '__unset' in doc.keys():
+			del doc['__unset']
+		return BaseModel(doc)
+
+	def coalesce_results(
+		self, *, batch: List[Dict[str, Any]]
+	) -> Union[Dict[str, Any], None]:
+		# [DOC] Merge events per doc _id, last write wins, except delete which beats later update
+		docs_opers = {}
+		# [DOC] Docs created, deleted in same window are dropped, as client never saw them
+		dropped_docs = set()
+		for results in batch:
+			for doc in results['args']['docs']:
+				oper = results['args']['oper']
+				if doc._id in dropped_docs and oper == 'update':
+					continue
+				if doc._id in docs_opers.keys():
+					doc_oper = docs_opers[doc._id]['oper']
+					if doc_oper == 'delete' and oper == 'update':
+						continue
+					if doc_oper == 'create' and oper == 'delete':
+						del docs_opers[doc._id]
+						dropped_docs.add(doc._id)
+						continue
+					# [DOC] Delta of update is merged into earlier doc, keeping version of first delta as __from_version
+					if oper == 'update' and '__version' in doc._attrs() and doc_oper != 'delete':
+						doc = self.coalesce_delta(
+							doc=docs_opers[doc._id]['doc'],
+							delta=doc,
+							full=doc_oper == 'create',
+						)
+					# [DOC] Doc created in same window is still new to client
+					if doc_oper == 'create' and oper == 'update':
+						oper = 'create'
+					del docs_opers[doc._id]
+				docs_opers[doc._id] = {'oper': oper, 'doc': doc}
+		if not docs_opers:
+			return None
+		opers = [doc_oper['oper'] for doc_oper in docs_opers.values()]
+		args = {
+			'count': len(opers),
+			'oper': opers[0] if len(set(opers)) == 1 else 'mixed',
+			'opers': opers,
+			'docs': [doc_oper['doc'] for doc_oper in docs_opers.values()],
+		}
+		if 'resume' in batch[-1]['args'].keys():
+			args['resume'] = batch[-1]['args']['resume']
+		return {
+			'status': 200,
+			'msg': f'Detected {args["count"]} docs.',
+			'args': args,
+		}
@@ -1,6 +1,6 @@
 from config import Config
 from enums import Event, DELETE_STRATEGY
-from data import Data
+from data import Data, READ_PREFERENCES
 from utils import (
 	validate_doc,
 	InvalidAttrException,
@@ -22,6 +22,7 @@ from classes import (
 	ATTR,
 	PERM,
 	EXTN,
+	EXTN_CACHE,
 	ATTR_MOD,
 	CACHE,
 	CACHED_QUERY,
@@ -29,7 +30,7 @@ from classes import (
 )
 from base_method import BaseMethod
 
-from typing import List, Dict, Union, Tuple, Callable, Any, TypedDict
+from typing import List, Dict, Union, Tuple, Set, Callable, Any, TypedDict
 
 from PIL import Image
 from bson import ObjectId
@@ -46,6 +47,10 @@ class BaseModule:
 	defaults: Dict[str, Any]
 	unique_attrs: List[str]
 	extns: Dict[str, EXTN]
+	extn_cache: EXTN_CACHE
+	slow_query_threshold: float
+	total_strategy: Union[bool, int, str]
+	read_preference: str
 	privileges: List[str]
 	methods: TypedDict(
 		'METHODS',
@@ -77,6 +82,14 @@ class BaseModule:
 			self.unique_attrs = []
 		if not getattr(self, 'extns', None):
 			self.extns = {}
+		if not getattr(self, 'extn_cache', None):
+			self.extn_cache = None
+		if not hasattr(self, 'slow_query_threshold'):
+			self.slow_query_threshold = None
+		if not hasattr(self, 'total_strategy'):
+			self.total_strategy = None
+		if not getattr(self, 'read_preference', None):
+			self.read_preference = None
 		if not getattr(self, 'privileges', None):
 			self.privileges = ['read', 'create', 'update', 'delete', 'admin']
 		if not getattr(self, 'methods', None):
@@ -109,6 +122,8 @@ class BaseModule:
 			self.defaults = copy.deepcopy(Config.modules[self.proxy].defaults)
 			self.unique_attrs = copy.deepcopy(Config.modules[self.proxy].unique_attrs)
 			self.extns = copy.deepcopy(Config.modules[self.proxy].extns)
+			self.extn_cache = Config.modules[self.proxy].extn_cache
+			self.read_preference = Config.modules[self.proxy].read_preference
 			self.privileges = copy.deepcopy(Config.modules[self.proxy].privileges)
 			# [DOC] Update methods from original module
 			for method in Config.modules[self.proxy].methods.keys():
@@ -132,6 +147,9 @@ class BaseModule:
 							'get_method': Config.modules[self.proxy]
 							.methods[method]
 							.get_method,
+							'read_preference': Config.modules[self.proxy]
+							.methods[method]
+							.read_preference,
 						}
 				# [DOC] Create methods functions in proxy module if not present
 				if not getattr(self, method, None):
@@ -240,6 +258,17 @@ class BaseModule:
 				or self.methods[method]['watch_method'] == False
 			):
 				self.methods[method]['watch_method'] = False
+			# [DOC] Check method read_preference attr, set it or validate it.
+			if 'read_preference' not in self.methods[method].keys():
+				self.methods[method]['read_preference'] = None
+			elif (
+				self.methods[method]['read_preference'] != None
+				and self.methods[method]['read_preference'] not in READ_PREFERENCES.keys()
+			):
+				logger.error(
+					f'Invalid read_preference \'{self.methods[method]["read_preference"]}\' of method \'{method}\' of module \'{self.module_name}\'. Exiting.'
+				)
+				exit()
 			# [DOC] Check method get_method attr, set it or update it if required.
 			if 'get_method' not in self.methods[method].keys():
 				self.methods[method]['get_method'] = False
@@ -303,7 +332,14 @@ class BaseModule:
 				watch_method=self.methods[method]['watch_method'],
 				get_method=self.methods[method]['get_method'],
 				post_method=self.methods[method]['post_method'],
+				read_preference=self.methods[method]['read_preference'],
+			)
+		# [DOC] Check read_preference for invalid read preference mode
+		if self.read_preference and self.read_preference not in READ_PREFERENCES.keys():
+			logger.error(
+				f'Invalid read_preference \'{self.read_preference}\' of module \'{self.module_name}\'. Exiting.'
 			)
+			exit()
 		# [DOC] Check extns for invalid extnded attrs
 		for attr in self.extns.keys():
 			if type(self.extns[attr]) not in [EXTN, ATTR_MOD]:
@@ -339,6 +375,23 @@ class BaseModule:
 		else:
 			return object.__getattribute__(self, attr)
 
+	def _read_preference(self, *, query: Query) -> str:
+		# [DOC] $fresh reads, such as reads following own writes, go to primary
+		if '$fresh' in query and query['$fresh'] == True:
+			return 'primary'
+		# [DOC] Read preference of calling method, or module, is set in call context by BaseMethod
+		call_ctx = Data.get_call_ctx()
+		# [DOC] Reads in calls of write, other methods, of any module, go to primary
+		if call_ctx and not call_ctx['read_method']:
+			return 'primary'
+		if (
+			call_ctx
+			and call_ctx['module'] == self.module_name
+			and call_ctx['read_preference']
+		):
+			return call_ctx['read_preference']
+		return self.read_preference or Config.data_read_preference
+
 	async def pre_read(
 		self,
 		skip_events: LIMP_EVENTS,
@@ -393,6 +446,10 @@ class BaseModule:
 				return pre_read
 			skip_events, env, query, doc, payload = pre_read
 		else: payload = {}
+		# [DOC] Use module total_strategy for total count, if not set by $total
+		if self.total_strategy != None and '$total' not in query:
+			query['$total'] = self.total_strategy
+		read_preference = self._read_preference(query=query)
 		# [DOC] Check for cache workflow instructins
 		if self.cache:
 			results = False
@@ -414,6 +471,7 @@ class BaseModule:
 										collection=self.collection,
 										attrs=self.attrs,
 										query=query,
+										read_preference=read_preference,
 									)
 								cache_set.queries[cache_key] = CACHED_QUERY(
 									results=results
@@ -435,6 +493,7 @@ class BaseModule:
 								collection=self.collection,
 								attrs=self.attrs,
 								query=query,
+								read_preference=read_preference,
 							)
 						cache_set.queries[cache_key] = CACHED_QUERY(results=results)
 			if not results:
@@ -444,6 +503,7 @@ class BaseModule:
 					attrs=self.attrs,
 					query=query,
 					skip_extn='$extn' in query or Event.EXTN in skip_events,
+					read_preference=read_preference,
 				)
 		else:
 			results = await Data.read(
@@ -452,6 +512,7 @@ class BaseModule:
 				attrs=self.attrs,
 				query=query,
 				skip_extn='$extn' in query or Event.EXTN in skip_events,
+				read_preference=read_preference,
 			)
 		if Event.ON not in skip_events:
 			# [DOC] Check proxy module
@@ -495,6 +556,93 @@ class BaseModule:
 			status=200, msg=f'Found {results["count"]} docs.', args=results
 		)
 
+	async def read_stream(
+		self,
+		skip_events: LIMP_EVENTS = [],
+		env: LIMP_ENV = {},
+		query: Union[LIMP_QUERY, Query] = [],
+		doc: LIMP_DOC = {},
+		batch_size: int = None,
+	) -> DictObj:
+		if not batch_size:
+			batch_size = Config.data_stream_batch
+		if Event.PRE not in skip_events:
+			# [DOC] Check proxy module
+			if self.proxy:
+				# [DOC] Call original module pre_read
+				pre_read = await Config.modules[self.proxy].pre_read(
+					skip_events=skip_events, env=env, query=query, doc=doc, payload={}
+				)
+				if type(pre_read) in [DictObj, dict]:
+					yield pre_read
+					return
+				skip_events, env, query, doc, payload = pre_read
+			pre_read = await self.pre_read(
+				skip_events=skip_events, env=env, query=query, doc=doc, payload={}
+			)
+			if type(pre_read) in [DictObj, dict]:
+				yield pre_read
+				return
+			skip_events, env, query, doc, payload = pre_read
+		else: payload = {}
+
+		# [DOC] if $attrs query arg is present return only required keys.
+		query_attrs = None
+		if '$attrs' in query:
+			query_attrs = ['_id'] + query['$attrs']
+
+		async for results in Data.read_stream(
+			env=env,
+			collection=self.collection,
+			attrs=self.attrs,
+			query=query,
+			batch_size=batch_size,
+			skip_extn='$extn' in query or Event.EXTN in skip_events,
+			read_preference=self._read_preference(query=query),
+		):
+			# [DOC] on_read is called per batch, with no total for streamed reads
+			results['total'] = None
+			if Event.ON not in skip_events:
+				# [DOC] Check proxy module
+				if self.proxy:
+					# [DOC] Call original module on_read
+					on_read = await Config.modules[self.proxy].on_read(
+						results=results,
+						skip_events=skip_events,
+						env=env,
+						query=query,
+						doc=doc,
+						payload=payload,
+					)
+					if type(on_read) in [DictObj, dict]:
+						yield on_read
+						return
+					results, skip_events, env, query, doc, payload = on_read
+				on_read = await self.on_read(
+					results=results,
+					skip_events=skip_events,
+					env=env,
+					query=query,
+					doc=doc,
+					payload=payload,
+				)
+				if type(on_read) in [DictObj, dict]:
+					yield on_read
+					return
+				results, skip_events, env, query, doc, payload = on_read
+				if query_attrs:
+					for i in range(len(results['docs'])):
+						results['docs'][i] = BaseModel(
+							{
+								attr: results['docs'][i][attr]
+								for attr in query_attrs
+								if attr in results['docs'][i]._attrs()
+							}
+						)
+			yield self.status(
+				status=200, msg=f'Streamed {results["count"]} docs.', args=results
+			)
+
 	async def pre_watch(
 		self,
 		skip_events: LIMP_EVENTS,
@@ -551,20 +699,117 @@ class BaseModule:
 			skip_events, env, query, doc, payload = pre_watch
 		else: payload = {}
 
+		# [DOC] Live watch keeps sorted, limited window of query results in memory, and sends window diffs only
+		live = None
+		if '$live' in query:
+			if query['$live'] == True:
+				live = {
+					'sort': query['$sort'] if '$sort' in query else {'_id': -1},
+					'limit': query['$limit']
+					if '$limit' in query
+					else Config.data_watch_live_limit,
+					'attrs': query['$attrs'] if '$attrs' in query else None,
+					'window': None,
+					# [DOC] Raw values of sort attrs of window docs, by _id, as processed docs, with LOCALE, EXTN attrs, don't compare same as by $sort
+					'sort_vals': {},
+					'more': False,
+				}
+				# [DOC] Add _id as tie-breaker to sort, so every doc has unique position in window
+				if '_id' not in live['sort'].keys():
+					live['sort'] = {
+						**live['sort'],
+						'_id': list(live['sort'].values())[0] if live['sort'] else -1,
+					}
+				# [DOC] Window is always read from start, with full docs, so sort attrs are available
+				for attr in ['$attrs', '$delta', '$skip', '$resume']:
+					if attr in query:
+						del query[attr]
+			del query['$live']
+		skip_extn = '$extn' in query or Event.EXTN in skip_events
+
 		logger.debug('Preparing async loop at BaseModule')
 		async for results in Data.watch(
 			env=env,
 			collection=self.collection,
 			attrs=self.attrs,
 			query=query,
-			skip_extn='$extn' in query or Event.EXTN in skip_events,
+			skip_extn=skip_extn,
+			read_preference=self._read_preference(query=query),
+			live=live['sort'] if live else None,
 		):
 			logger.debug(f'Received watch results at BaseModule: {results}')
 
 			if 'stream' in results.keys():
 				yield results
+				# [DOC] Read initial window once change stream is open, so no change is missed in between
+				if live and live['window'] == None:
+					live['window'] = []
+					diffs = await self._live_refill(
+						skip_events=skip_events,
+						env=env,
+						query=query,
+						doc=doc,
+						payload=payload,
+						live=live,
+						skip_extn=skip_extn,
+					)
+					if type(diffs) in [DictObj, dict]:
+						yield diffs
+						continue
+					yield self.status(
+						status=200,
+						msg=f'Live query has {len(diffs)} docs.',
+						args={'count': len(diffs), 'oper': 'live', 'diffs': diffs},
+					)
 				continue
 
+			# [DOC] Live window is re-read, if change stream could not be resumed
+			if 'resync' in results.keys() and live:
+				diffs = [
+					{'oper': 'leave', 'index': 0, '_id': doc._id}
+					for doc in live['window']
+				]
+				live['window'] = []
+				live['sort_vals'] = {}
+				refill_diffs = await self._live_refill(
+					skip_events=skip_events,
+					env=env,
+					query=query,
+					doc=doc,
+					payload=payload,
+					live=live,
+					skip_extn=skip_extn,
+				)
+				if type(refill_diffs) in [DictObj, dict]:
+					yield refill_diffs
+					continue
+				diffs += refill_diffs
+				yield self.status(
+					status=200,
+					msg=f'Detected {len(diffs)} live query changes.',
+					args={'count': len(diffs), 'oper': 'live', 'diffs': diffs},
+				)
+				continue
+
+			# [DOC] Resume token is no longer available, client should re-read before using next events
+			if 'resync' in results.keys():
+				yield self.status(
+					status=200,
+					msg='Watch could not be resumed. Full resync is required.',
+					args={'code': 'WATCH_RESYNC', 'resync': True},
+				)
+				continue
+
+			# [DOC] Docs of shared change stream are shared by subscribers, with their encoding. Docs that hooks could change are copied, and sent encoded per subscriber
+			if '__docs_encoded' in results.keys():
+				watch_hooks = Event.ON not in skip_events and (
+					self.proxy or type(self).on_watch != BaseModule.on_watch
+				)
+				if watch_hooks or live:
+					results['docs'] = copy.deepcopy(results['docs'])
+				if watch_hooks or live or '$attrs' in query:
+					del results['__docs_encoded']
+
 			if Event.ON not in skip_events:
 				# [DOC] Check proxy module
 				if self.proxy:
@@ -598,16 +843,247 @@ class BaseModule:
 						results['docs'][i] = BaseModel(
 							{
 								attr: results['docs'][i][attr]
-								for attr in query['$attrs']
+								for attr in [*query['$attrs'], '__version', '__unset']
 								if attr in results['docs'][i]._attrs()
 							}
 						)
+			# [DOC] Changes not affecting live window are ignored
+			if live:
+				diffs = await self._live_apply(
+					skip_events=skip_events,
+					env=env,
+					query=query,
+					doc=doc,
+					payload=payload,
+					live=live,
+					results=results,
+					skip_extn=skip_extn,
+				)
+				if type(diffs) in [DictObj, dict]:
+					yield diffs
+					continue
+				if diffs:
+					yield self.status(
+						status=200,
+						msg=f'Detected {len(diffs)} live query changes.',
+						args={'count': len(diffs), 'oper': 'live', 'diffs': diffs},
+					)
+				continue
+
 			yield self.status(
 				status=200, msg=f'Detected {results["count"]} docs.', args=results
 			)
 
 		logger.debug('Generator ended at BaseModule.')
 
+	async def _live_apply(
+		self,
+		*,
+		skip_events: LIMP_EVENTS,
+		env: LIMP_ENV,
+		query: Query,
+		doc: LIMP_DOC,
+		payload: Dict[str, Any],
+		live: Dict[str, Any],
+		results: Dict[str, Any],
+		skip_extn: bool,
+	) -> Union[List[Dict[str, Any]], DictObj]:
+		window = live['window']
+		diffs = []
+		for results_doc in results['docs']:
+			index = None
+			for i in range(len(window)):
+				if window[i]._id == results_doc._id:
+					index = i
+					break
+			if index != None:
+				del window[index]
+				del live['sort_vals'][results_doc._id]
+			if not results.get('match', results['oper'] != 'delete'):
+				if index != None:
+					diffs.append({'oper': 'leave', 'index': index, '_id': results_doc._id})
+				continue
+			sort_vals = results['sort_vals'][results_doc._id]
+			position = len(window)
+			for i in range(len(window)):
+				if (
+					self._live_compare(
+						sort=live['sort'],
+						sort_vals=sort_vals,
+						other_sort_vals=live['sort_vals'][window[i]._id],
+					)
+					< 0
+				):
+					position = i
+					break
+			# [DOC] Doc sorting after window could be preceded by docs not in window
+			if position == len(window) and live['more']:
+				if index != None:
+					diffs.append({'oper': 'leave', 'index': index, '_id': results_doc._id})
+				continue
+			window.insert(position, results_doc)
+			live['sort_vals'][results_doc._id] = sort_vals
+			if index == None:
+				diffs.append(
+					{'oper': 'enter', 'index': position, 'doc': self._live_doc(live=live, doc=results_doc)}
+				)
+			elif index != position:
+				diffs.append(
+					{
+						'oper': 'move',
+						'from': index,
+						'index': position,
+						'doc': self._live_doc(live=live, doc=results_doc),
+					}
+				)
+			else:
+				diffs.append(
+					{'oper': 'update', 'index': position, 'doc': self._live_doc(live=live, doc=results_doc)}
+				)
+			if len(window) > live['limit']:
+				leave_doc = window.pop()
+				del live['sort_vals'][leave_doc._id]
+				live['more'] = True
+				diffs.append(
+					{'oper': 'leave', 'index': len(window), '_id': leave_doc._id}
+				)
+		if len(window) < live['limit'] and live['more']:
+			refill_diffs = await self._live_refill(
+				skip_events=skip_events,
+				env=env,
+				query=query,
+				doc=doc,
+				payload=payload,
+				live=live,
+				skip_extn=skip_extn,
+			)
+			if type(refill_diffs) in [DictObj, dict]:
+				return refill_diffs
+			diffs += refill_diffs
+		return diffs
+
+	async def _live_refill(
+		self,
+		*,
+		skip_events: LIMP_EVENTS,
+		env: LIMP_ENV,
+		query: Query,
+		doc: LIMP_DOC,
+		payload: Dict[str, Any],
+		live: Dict[str, Any],
+		skip_extn: bool,
+	) -> Union[List[Dict[str, Any]], DictObj]:
+		# [DOC] Read docs following window, to fill it up to limit
+		window = live['window']
+		read_query = copy.deepcopy(query)
+		read_query['$sort'] = live['sort']
+		read_query['$skip'] = len(window)
+		read_query['$limit'] = live['limit'] - len(window)
+		read_query['$total'] = 'none'
+		results = await Data.read(
+			env=env,
+			collection=self.collection,
+			attrs=self.attrs,
+			query=read_query,
+			skip_extn=skip_extn,
+			read_preference=self._read_preference(query=query),
+			sort_vals=True,
+		)
+		# [DOC] Raw sort values are kept aside, as on_read hooks could replace results
+		sort_vals = results['sort_vals']
+		live['more'] = len(results['docs']) == read_query['$limit']
+		# [DOC] Window docs are passed to on_read, same as docs of read call
+		if Event.ON not in skip_events:
+			# [DOC] Check proxy module
+			if self.proxy:
+				# [DOC] Call original module on_read
+				on_read = await Config.modules[self.proxy].on_read(
+					results=results,
+					skip_events=skip_events,
+					env=env,
+					query=read_query,
+					doc=doc,
+					payload=payload,
+				)
+				if type(on_read) in [DictObj, dict]:
+					return on_read
+				results, skip_events, env, read_query, doc, payload = on_read
+			on_read = await self.on_read(
+				results=results,
+				skip_events=skip_events,
+				env=env,
+				query=read_query,
+				doc=doc,
+				payload=payload,
+			)
+			if type(on_read) in [DictObj, dict]:
+				return on_read
+			results, skip_events, env, read_query, doc, payload = on_read
+		diffs = []
+		for window_doc in results['docs']:
+			if window_doc._id in [live_doc._id for live_doc in window]:
+				continue
+			window.append(window_doc)
+			live['sort_vals'][window_doc._id] = sort_vals.get(window_doc._id, {})
+			diffs.append(
+				{
+					'oper': 'enter',
+					'index': len(window) - 1,
+					'doc': self._live_doc(live=live, doc=window_doc),
+				}
+			)
+		return diffs
+
+	def _live_doc(self, *, live: Dict[str, Any], doc: BaseModel) -> BaseModel:
+		if not live['attrs']:
+			return doc
+		return BaseModel(
+			{
+				attr: doc[attr]
+				for attr in ['_id', *live['attrs']]
+				if attr in doc._attrs()
+			}
+		)
+
+	def _live_compare(
+		self,
+		*,
+		sort: Dict[str, int],
+		sort_vals: Dict[str, Any],
+		other_sort_vals: Dict[str, Any],
+	) -> int:
+		# [DOC] Compare docs by raw values of sort attrs, ranking value types in Mongo sort order
+		def sort_val(vals: Dict[str, Any], attr: str) -> Tuple[int, Any]:
+			val = vals.get(attr)
+			if val == None:
+				return (0, None)
+			elif type(val) == bool:
+				return (6, val)
+			elif type(val) in [int, float]:
+				return (1, val)
+			elif type(val) == str:
+				return (2, val)
+			elif type(val) == dict:
+				return (3, str(val))
+			elif type(val) == list:
+				return (4, str(val))
+			elif type(val) == ObjectId:
+				return (5, val)
+			elif type(val) == datetime.datetime:
+				return (7, val)
+			return (8, str(val))
+
+		for attr in sort.keys():
+			doc_val = sort_val(sort_vals, attr)
+			other_val = sort_val(other_sort_vals, attr)
+			if doc_val == other_val:
+				continue
+			if doc_val[0] == other_val[0] == 0:
+				continue
+			result = -1 if doc_val < other_val else 1
+			return result * sort[attr]
+		return 0
+
 	async def pre_create(
 		self,
 		skip_events: LIMP_EVENTS,
@@ -720,7 +1196,8 @@ class BaseModule:
 						unique_attrs_query[0].append(
 							{child_attr: doc[child_attr] for child_attr in attr}
 						)
-				unique_attrs_query.append({'$limit': 1})
+				# [DOC] Unique check is read-before-write, use $fresh to read from primary
+				unique_attrs_query.append({'$limit': 1, '$fresh': True})
 				unique_results = await self.read(
 					skip_events=[Event.PERM], env=env, query=unique_attrs_query
 				)
@@ -771,7 +1248,9 @@ class BaseModule:
 		# [DOC] create soft action is to only retrurn the new created doc _id.
 		if Event.SOFT in skip_events:
 			results = await self.methods['read'](
-				skip_events=[Event.PERM], env=env, query=[[{'_id': results['docs'][0]}]]
+				skip_events=[Event.PERM],
+				env=env,
+				query=[[{'_id': results['docs'][0]}], {'$fresh': True}],
 			)
 			results = results['args']
 
@@ -782,6 +1261,275 @@ class BaseModule:
 			status=200, msg=f'Created {results["count"]} docs.', args=results
 		)
 
+	async def pre_create_many(
+		self,
+		skip_events: LIMP_EVENTS,
+		env: LIMP_ENV,
+		query: Union[LIMP_QUERY, Query],
+		doc: LIMP_DOC,
+		payload: Dict[str, Any],
+	) -> Tuple[
+		LIMP_EVENTS, LIMP_ENV, Union[LIMP_QUERY, Query], LIMP_DOC, Dict[str, Any]
+	]:
+		return (skip_events, env, query, doc, payload)
+
+	async def on_create_many(
+		self,
+		results: Dict[str, Any],
+		skip_events: LIMP_EVENTS,
+		env: LIMP_ENV,
+		query: Union[LIMP_QUERY, Query],
+		doc: LIMP_DOC,
+		payload: Dict[str, Any],
+	) -> Tuple[
+		Dict[str, Any],
+		LIMP_EVENTS,
+		LIMP_ENV,
+		Union[LIMP_QUERY, Query],
+		LIMP_DOC,
+		Dict[str, Any],
+	]:
+		return (results, skip_events, env, query, doc, payload)
+
+	async def create_many(
+		self,
+		skip_events: LIMP_EVENTS = [],
+		env: LIMP_ENV = {},
+		query: Union[LIMP_QUERY, Query] = [],
+		doc: LIMP_DOC = {},
+	) -> DictObj:
+		if 'docs' not in doc.keys() or type(doc['docs']) != list or not doc['docs']:
+			return self.status(
+				status=400,
+				msg=f'Doc arg \'docs\' is required as list of docs for \'create_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+				args={'code': 'INVALID_DOCS'},
+			)
+		# [DOC] pre_create_many, on_create_many hooks receive whole batch of docs as doc['docs']
+		if Event.PRE not in skip_events:
+			# [DOC] Check proxy module
+			if self.proxy:
+				# [DOC] Call original module pre_create_many
+				pre_create_many = await Config.modules[self.proxy].pre_create_many(
+					skip_events=skip_events, env=env, query=query, doc=doc, payload={}
+				)
+				if type(pre_create_many) in [DictObj, dict]:
+					return pre_create_many
+				skip_events, env, query, doc, payload = pre_create_many
+			pre_create_many = await self.pre_create_many(
+				skip_events=skip_events, env=env, query=query, doc=doc, payload={}
+			)
+			if type(pre_create_many) in [DictObj, dict]:
+				return pre_create_many
+			skip_events, env, query, doc, payload = pre_create_many
+		else: payload = {}
+
+		docs_results: List[Dict[str, Any]] = [None for _ in doc['docs']]
+		create_docs: Dict[int, LIMP_DOC] = {}
+		for i in range(len(doc['docs'])):
+			create_doc = doc['docs'][i]
+			if type(create_doc) not in [dict, DictObj]:
+				docs_results[i] = {
+					'status': 400,
+					'msg': 'Doc is not a valid dict.',
+					'args': {'code': 'INVALID_DOC'},
+				}
+				continue
+			# [DOC] Deleted all extra doc args
+			create_doc = {
+				attr: create_doc[attr]
+				for attr in ['_id', *self.attrs.keys()]
+				if attr in create_doc.keys() and create_doc[attr] != None
+			}
+			# [DOC] Append host_add, user_agent, create_time, diff if it's present in attrs.
+			if (
+				'user' in self.attrs.keys()
+				and 'host_add' not in create_doc.keys()
+				and env['session']
+				and Event.ARGS not in skip_events
+			):
+				create_doc['user'] = env['session'].user._id
+			if 'create_time' in self.attrs.keys():
+				create_doc['create_time'] = datetime.datetime.utcnow().isoformat()
+			if 'host_add' in self.attrs.keys() and 'host_add' not in create_doc.keys():
+				create_doc['host_add'] = env['REMOTE_ADDR']
+			if 'user_agent' in self.attrs.keys() and 'user_agent' not in create_doc.keys():
+				create_doc['user_agent'] = env['HTTP_USER_AGENT']
+			if Event.ARGS not in skip_events:
+				# [DOC] Check presence and validate all attrs in doc args
+				try:
+					validate_doc(
+						doc=create_doc,
+						attrs=self.attrs,
+						skip_events=skip_events,
+						env=env,
+						query=query,
+					)
+				except MissingAttrException as e:
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'{str(e)} for \'create_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+						'args': {'code': 'MISSING_ATTR'},
+					}
+					continue
+				except InvalidAttrException as e:
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'{str(e)} for \'create_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+						'args': {'code': 'INVALID_ATTR'},
+					}
+					continue
+				except ConvertAttrException as e:
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'{str(e)} for \'create_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+						'args': {'code': 'CONVERT_INVALID_ATTR'},
+					}
+					continue
+			create_docs[i] = create_doc
+
+		# [DOC] Check unique_attrs of all docs with single read, as well as among docs themselves
+		if Event.ARGS not in skip_events and self.unique_attrs and create_docs:
+			unique_attrs_str = ', '.join(
+				map(
+					lambda _: ('(' + ', '.join(_) + ')') if type(_) == tuple else _,
+					self.unique_attrs,
+				)
+			)
+			unique_attrs_query = [[]]
+			unique_attrs_list = []
+			for attr in self.unique_attrs:
+				if type(attr) == str:
+					attr = (attr,)
+				unique_attrs_list.append(attr)
+				for create_doc in create_docs.values():
+					unique_attrs_query[0].append(
+						{child_attr: create_doc.get(child_attr) for child_attr in attr}
+					)
+			unique_attrs_query.append(
+				{
+					'$attrs': [
+						child_attr
+						for attr in unique_attrs_list
+						for child_attr in attr
+					]
+				}
+			)
+			unique_results = await Data.read(
+				env=env,
+				collection=self.collection,
+				attrs=self.attrs,
+				query=Query(unique_attrs_query),
+				skip_process=True,
+			)
+
+			# [DOC] Normalise values to hashable form, so dicts compare regardless of keys order, and types are not mixed
+			def unique_val(val: Any) -> Any:
+				if type(val) == dict:
+					return (
+						'dict',
+						tuple(sorted((key, unique_val(val[key])) for key in val.keys())),
+					)
+				elif type(val) == list:
+					return ('list', tuple(unique_val(item) for item in val))
+				elif type(val) in [int, float]:
+					return ('number', val)
+				return (type(val).__name__, val)
+
+			unique_vals: Set[Tuple[Tuple[str, ...], Tuple[Any, ...]]] = set()
+			for unique_doc in unique_results['docs']:
+				unique_doc = unique_doc._attrs()
+				for attr in unique_attrs_list:
+					unique_vals.add(
+						(
+							attr,
+							tuple(unique_val(unique_doc.get(child_attr)) for child_attr in attr),
+						)
+					)
+			for i in list(create_docs.keys()):
+				create_doc_vals = [
+					(
+						attr,
+						tuple(
+							unique_val(create_docs[i].get(child_attr)) for child_attr in attr
+						),
+					)
+					for attr in unique_attrs_list
+				]
+				if any(val in unique_vals for val in create_doc_vals):
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'A doc with the same \'{unique_attrs_str}\' already exists.',
+						'args': {'code': 'DUPLICATE_DOC'},
+					}
+					del create_docs[i]
+				else:
+					unique_vals.update(create_doc_vals)
+
+		# [DOC] Execute Data driver create_many
+		if create_docs:
+			results = await Data.create_many(
+				env=env,
+				collection=self.collection,
+				attrs=self.attrs,
+				docs=list(create_docs.values()),
+			)
+		else:
+			results = {'count': 0, 'docs': [], 'errors': {}}
+		create_docs_indexes = list(create_docs.keys())
+		for j in range(len(create_docs_indexes)):
+			i = create_docs_indexes[j]
+			if j in results['errors'].keys():
+				docs_results[i] = {
+					'status': 400,
+					'msg': results['errors'][j],
+					'args': {'code': 'CREATE_FAILED'},
+				}
+			else:
+				docs_results[i] = {
+					'status': 200,
+					'msg': 'Created doc.',
+					'args': {'_id': create_docs[i]['_id']},
+				}
+		del results['errors']
+		results['results'] = docs_results
+
+		if Event.ON not in skip_events:
+			# [DOC] Check proxy module
+			if self.proxy:
+				# [DOC] Call original module on_create_many
+				on_create_many = await Config.modules[self.proxy].on_create_many(
+					results=results,
+					skip_events=skip_events,
+					env=env,
+					query=query,
+					doc=doc,
+					payload=payload,
+				)
+				if type(on_create_many) in [DictObj, dict]:
+					return on_create_many
+				results, skip_events, env, query, doc, payload = on_create_many
+			on_create_many = await self.on_create_many(
+				results=results,
+				skip_events=skip_events,
+				env=env,
+				query=query,
+				doc=doc,
+				payload=payload,
+			)
+			if type(on_create_many) in [DictObj, dict]:
+				return on_create_many
+			results, skip_events, env, query, doc, payload = on_create_many
+
+		# [DOC] Module collection is updated, update_cache
+		if results['count']:
+			asyncio.create_task(self.update_cache(env=env))
+
+		return self.status(
+			status=200,
+			msg=f'Created {results["count"]} of {len(doc["docs"])} docs.',
+			args=results,
+		)
+
 	async def pre_update(
 		self,
 		skip_events: LIMP_EVENTS,
@@ -925,7 +1673,8 @@ class BaseModule:
 				unique_attrs_query.append(
 					{'_id': {'$nin': [doc._id for doc in docs_results['docs']]}}
 				)
-				unique_attrs_query.append({'$limit': 1})
+				# [DOC] Unique check is read-before-write, use $fresh to read from primary
+				unique_attrs_query.append({'$limit': 1, '$fresh': True})
 				unique_results = await self.read(
 					skip_events=[Event.PERM], env=env, query=unique_attrs_query
 				)
@@ -950,6 +1699,10 @@ class BaseModule:
 			docs=[doc._id for doc in docs_results['docs']],
 			doc=doc,
 		)
+		# [DOC] Drop updated docs from extn cache, in case collection change stream is not available
+		Data.extn_cache_invalidate(
+			collection=self.collection, docs=[doc._id for doc in docs_results['docs']]
+		)
 		if Event.ON not in skip_events:
 			# [DOC] Check proxy module
 			if self.proxy:
@@ -1019,6 +1772,235 @@ class BaseModule:
 			status=200, msg=f'Updated {results["count"]} docs.', args=results
 		)
 
+	async def pre_update_many(
+		self,
+		skip_events: LIMP_EVENTS,
+		env: LIMP_ENV,
+		query: Union[LIMP_QUERY, Query],
+		doc: LIMP_DOC,
+		payload: Dict[str, Any],
+	) -> Tuple[
+		LIMP_EVENTS, LIMP_ENV, Union[LIMP_QUERY, Query], LIMP_DOC, Dict[str, Any]
+	]:
+		return (skip_events, env, query, doc, payload)
+
+	async def on_update_many(
+		self,
+		results: Dict[str, Any],
+		skip_events: LIMP_EVENTS,
+		env: LIMP_ENV,
+		query: Union[LIMP_QUERY, Query],
+		doc: LIMP_DOC,
+		payload: Dict[str, Any],
+	) -> Tuple[
+		Dict[str, Any],
+		LIMP_EVENTS,
+		LIMP_ENV,
+		Union[LIMP_QUERY, Query],
+		LIMP_DOC,
+		Dict[str, Any],
+	]:
+		return (results, skip_events, env, query, doc, payload)
+
+	async def update_many(
+		self,
+		skip_events: LIMP_EVENTS = [],
+		env: LIMP_ENV = {},
+		query: Union[LIMP_QUERY, Query] = [],
+		doc: LIMP_DOC = {},
+	) -> DictObj:
+		if 'docs' not in doc.keys() or type(doc['docs']) != list or not doc['docs']:
+			return self.status(
+				status=400,
+				msg=f'Doc arg \'docs\' is required as list of updates for \'update_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+				args={'code': 'INVALID_DOCS'},
+			)
+		# [DOC] pre_update_many, on_update_many hooks receive whole batch of updates as doc['docs']
+		if Event.PRE not in skip_events:
+			# [DOC] Check proxy module
+			if self.proxy:
+				# [DOC] Call original module pre_update_many
+				pre_update_many = await Config.modules[self.proxy].pre_update_many(
+					skip_events=skip_events, env=env, query=query, doc=doc, payload={}
+				)
+				if type(pre_update_many) in [DictObj, dict]:
+					return pre_update_many
+				skip_events, env, query, doc, payload = pre_update_many
+			pre_update_many = await self.pre_update_many(
+				skip_events=skip_events, env=env, query=query, doc=doc, payload={}
+			)
+			if type(pre_update_many) in [DictObj, dict]:
+				return pre_update_many
+			skip_events, env, query, doc, payload = pre_update_many
+		else: payload = {}
+
+		if type(query) != Query:
+			query = Query(query)
+
+		docs_results: List[Dict[str, Any]] = [None for _ in doc['docs']]
+		bulk_updates: Dict[int, Dict[str, Any]] = {}
+		single_updates: Dict[int, Dict[str, Any]] = {}
+		for i in range(len(doc['docs'])):
+			update = doc['docs'][i]
+			if (
+				type(update) != dict
+				or type(update.get('query', [])) != list
+				or type(update.get('doc')) != dict
+			):
+				docs_results[i] = {
+					'status': 400,
+					'msg': 'Update is not a valid dict of \'query\', \'doc\'.',
+					'args': {'code': 'INVALID_UPDATE'},
+				}
+				continue
+			# [DOC] Every update query is combined with top-level query, which carries realm, permissions query args
+			update_query = Query(
+				[
+					*copy.deepcopy(update.get('query', [])),
+					*copy.deepcopy(query._query),
+				]
+			)
+			update_doc = update['doc']
+			if Event.ARGS not in skip_events:
+				# [DOC] Check presence and validate all attrs in doc args
+				try:
+					validate_doc(
+						doc=update_doc,
+						attrs=self.attrs,
+						allow_opers=True,
+						allow_none=True,
+						skip_events=skip_events,
+						env=env,
+						query=update_query,
+					)
+				except MissingAttrException as e:
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'{str(e)} for \'update_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+						'args': {'code': 'MISSING_ATTR'},
+					}
+					continue
+				except InvalidAttrException as e:
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'{str(e)} for \'update_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+						'args': {'code': 'INVALID_ATTR'},
+					}
+					continue
+				except ConvertAttrException as e:
+					docs_results[i] = {
+						'status': 400,
+						'msg': f'{str(e)} for \'update_many\' request on module \'{self.package_name.upper()}_{self.module_name.upper()}\'.',
+						'args': {'code': 'CONVERT_INVALID_ATTR'},
+					}
+					continue
+			# [DOC] Delete all attrs not belonging to the doc, checking against top level attrs only
+			update_doc = {
+				attr: update_doc[attr]
+				for attr in update_doc.keys()
+				if attr.split('.')[0] in self.attrs.keys() and update_doc[attr] != None
+			}
+			# [DOC] Check if there is anything yet to update
+			if not len(update_doc.keys()):
+				docs_results[i] = {
+					'status': 200,
+					'msg': 'Nothing to update.',
+					'args': {},
+				}
+				continue
+			# [DOC] Updates of unique_attrs, or for modules with diff, go through update to run duplication checks, diff workflow
+			unique_attrs_update = False
+			for attr in self.unique_attrs:
+				if type(attr) == str:
+					attr = (attr,)
+				if any(child_attr in update_doc.keys() for child_attr in attr):
+					unique_attrs_update = True
+					break
+			if unique_attrs_update or (self.diff and Event.DIFF not in skip_events):
+				single_updates[i] = {'query': update_query, 'doc': update_doc}
+			else:
+				bulk_updates[i] = {'query': update_query, 'doc': update_doc}
+
+		results = {'count': 0, 'matched': 0}
+		# [DOC] Execute Data driver update_many
+		if bulk_updates:
+			bulk_results = await Data.update_many(
+				env=env,
+				collection=self.collection,
+				attrs=self.attrs,
+				updates=list(bulk_updates.values()),
+			)
+			results['count'] += bulk_results['count']
+			results['matched'] += bulk_results['matched']
+			bulk_updates_indexes = list(bulk_updates.keys())
+			for j in range(len(bulk_updates_indexes)):
+				i = bulk_updates_indexes[j]
+				if j in bulk_results['errors'].keys():
+					docs_results[i] = {
+						'status': 400,
+						'msg': bulk_results['errors'][j],
+						'args': {'code': 'UPDATE_FAILED'},
+					}
+				else:
+					docs_results[i] = {'status': 200, 'msg': 'Updated docs.', 'args': {}}
+			# [DOC] Drop updated docs from extn cache. Updates not targeting single _id drop module docs altogether
+			updates_ids = [
+				Data._query_single_id(query=update['query'])
+				for update in bulk_updates.values()
+			]
+			if None not in updates_ids:
+				Data.extn_cache_invalidate(collection=self.collection, docs=updates_ids)
+			else:
+				Data.extn_cache_invalidate(collection=self.collection)
+
+		for i, update in single_updates.items():
+			update_results = await self.update(
+				skip_events=[*skip_events, Event.PRE, Event.ON],
+				env=env,
+				query=update['query'],
+				doc=update['doc'],
+			)
+			if update_results.status == 200 and 'count' in update_results.args:
+				results['count'] += update_results.args['count']
+				results['matched'] += len(update_results.args['docs'])
+			docs_results[i] = update_results
+		results['results'] = docs_results
+
+		if Event.ON not in skip_events:
+			# [DOC] Check proxy module
+			if self.proxy:
+				# [DOC] Call original module on_update_many
+				on_update_many = await Config.modules[self.proxy].on_update_many(
+					results=results,
+					skip_events=skip_events,
+					env=env,
+					query=query,
+					doc=doc,
+					payload=payload,
+				)
+				if type(on_update_many) in [DictObj, dict]:
+					return on_update_many
+				results, skip_events, env, query, doc, payload = on_update_many
+			on_update_many = await self.on_update_many(
+				results=results,
+				skip_events=skip_events,
+				env=env,
+				query=query,
+				doc=doc,
+				payload=payload,
+			)
+			if type(on_update_many) in [DictObj, dict]:
+				return on_update_many
+			results, skip_events, env, query, doc, payload = on_update_many
+
+		# [DOC] Module collection is updated, update_cache
+		if results['count']:
+			asyncio.create_task(self.update_cache(env=env))
+
+		return self.status(
+			status=200, msg=f'Updated {results["count"]} docs.', args=results
+		)
+
 	async def pre_delete(
 		self,
 		skip_events: LIMP_EVENTS,
@@ -1097,6 +2079,10 @@ class BaseModule:
 			docs=[doc._id for doc in docs_results['docs']],
 			strategy=strategy,
 		)
+		# [DOC] Drop deleted docs, soft or hard, from extn cache, in case collection change stream is not available
+		Data.extn_cache_invalidate(
+			collection=self.collection, docs=[doc._id for doc in docs_results['docs']]
+		)
 		if Event.ON not in skip_events:
 			# [DOC] Check proxy module
 			if self.proxy:
@@ -14,10 +14,10 @@ from typing import (
 	ForwardRef,
 )
 from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId, binary
+from bson import ObjectId, binary, json_util
 from aiohttp.web import WebSocketResponse
 
-import logging, re, datetime, time, json, copy
+import logging, re, datetime, time, json, copy, base64
 
 logger = logging.getLogger('limp')
 
@@ -59,11 +59,31 @@ LIMP_QUERY = List[
 			Dict[Literal['$sort'], Dict[str, Literal[1, -1]]],
 			Dict[Literal['$skip'], int],
 			Dict[Literal['$limit'], int],
+			Dict[Literal['$after'], str],
+			Dict[
+				Literal['$total'],
+				Union[bool, int, Literal['exact', 'capped', 'estimated', 'none']],
+			],
+			Dict[Literal['$fresh'], bool],
+			Dict[Literal['$resume'], str],
+			Dict[Literal['$delta'], bool],
+			Dict[Literal['$live'], bool],
+			Dict[
+				Literal['$coalesce'],
+				Union[bool, int, Dict[Literal['window', 'size'], int]],
+			],
 			Dict[Literal['$extn'], Union[Literal[False], List[str]]],
 			Dict[Literal['$attrs'], List[str]],
 			Dict[
 				Literal['$group'],
-				List[TypedDict('LIMP_QUERY_GROUP', by=str, count=int)],
+				List[
+					TypedDict(
+						'LIMP_QUERY_GROUP',
+						by=str,
+						count=int,
+						type=Literal['buckets', 'categories'],
+					)
+				],
 			],
 		],
 	]
@@ -793,6 +813,16 @@ class EXTN:
 		self.force = force
 
 
+class EXTN_CACHE:
+	period: int
+
+	def __repr__(self):
+		return f'<EXTN_CACHE:{self.period}>'
+
+	def __init__(self, *, period: int = None):
+		self.period = period
+
+
 class CACHE:
 	condition: Callable[[List[str], Dict[str, Any], Union['Query', LIMP_QUERY]], bool]
 	period: int
@@ -942,6 +972,10 @@ class InvalidQueryArgException(Exception):
 			'$in',
 			'$nin',
 			'$regex',
+			'$after',
+			'$total',
+			'$resume',
+			'$coalesce',
 		],
 		arg_type: Any,
 		arg_val: Any,
@@ -1002,6 +1036,10 @@ class Query(list):
 				del_attrs = []
 				for attr in query[i].keys():
 					if attr[0] == '$':
+						if attr in ['$after', '$total', '$resume', '$coalesce']:
+							Query.validate_arg(
+								arg_name=attr, arg_oper=attr, arg_val=query[i]
+							)
 						self._special[attr] = query[i][attr]
 						del_attrs.append(attr)
 					elif attr.startswith('__or'):
@@ -1183,10 +1221,88 @@ class Query(list):
 					arg_type=str,
 					arg_val=arg_val[arg_oper],
 				)
+		elif arg_oper == '$after':
+			try:
+				Query.decode_after(after=arg_val[arg_oper])
+			except:
+				raise InvalidQueryArgException(
+					arg_name=arg_name,
+					arg_oper=arg_oper,
+					arg_type=str,
+					arg_val=arg_val[arg_oper],
+				)
+		elif arg_oper == '$total':
+			if not (
+				type(arg_val[arg_oper]) == bool
+				or (type(arg_val[arg_oper]) == int and arg_val[arg_oper] > 0)
+				or arg_val[arg_oper] in ['exact', 'capped', 'estimated', 'none']
+			):
+				raise InvalidQueryArgException(
+					arg_name=arg_name,
+					arg_oper=arg_oper,
+					arg_type=[bool, int, 'exact', 'capped', 'estimated', 'none'],
+					arg_val=arg_val[arg_oper],
+				)
+		elif arg_oper == '$resume':
+			try:
+				Query.decode_resume(resume=arg_val[arg_oper])
+			except:
+				raise InvalidQueryArgException(
+					arg_name=arg_name,
+					arg_oper=arg_oper,
+					arg_type=str,
+					arg_val=arg_val[arg_oper],
+				)
+		elif arg_oper == '$coalesce':
+			if not (
+				type(arg_val[arg_oper]) == bool
+				or (type(arg_val[arg_oper]) == int and arg_val[arg_oper] >= 0)
+				or (
+					type(arg_val[arg_oper]) == dict
+					and set(arg_val[arg_oper].keys()).issubset({'window', 'size'})
+					and all(
+						type(coalesce_val) == int and coalesce_val > 0
+						for coalesce_val in arg_val[arg_oper].values()
+					)
+				)
+			):
+				raise InvalidQueryArgException(
+					arg_name=arg_name,
+					arg_oper=arg_oper,
+					arg_type=[bool, int, dict],
+					arg_val=arg_val[arg_oper],
+				)
 		else:
 			raise UnknownQueryArgException(arg_name=arg_name, arg_oper=arg_oper)
 
 
+	@classmethod
+	def encode_after(cls, *, vals: Dict[str, Any]) -> str:
+		return base64.urlsafe_b64encode(json_util.dumps(vals).encode('utf-8')).decode(
+			'utf-8'
+		)
+
+	@classmethod
+	def decode_after(cls, *, after: str) -> Dict[str, Any]:
+		vals = json_util.loads(base64.urlsafe_b64decode(after.encode('utf-8')))
+		if type(vals) != dict or '_id' not in vals.keys():
+			raise Exception(f'Cursor \'{after}\' is missing \'_id\' value.')
+		return vals
+
+	@classmethod
+	def encode_resume(cls, *, token: Dict[str, Any]) -> str:
+		return base64.urlsafe_b64encode(json_util.dumps(token).encode('utf-8')).decode(
+			'utf-8'
+		)
+
+	@classmethod
+	def decode_resume(cls, *, resume: str) -> Dict[str, Any]:
+		token = json_util.loads(base64.urlsafe_b64decode(resume.encode('utf-8')))
+		if type(token) != dict or '_data' not in token.keys():
+			raise Exception(f'Resume token \'{resume}\' is missing \'_data\' value.')
+		return token
+
+
 class QueryAttrList(list):
 	def __init__(
 		self,
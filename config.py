@@ -88,8 +88,35 @@ class Config:
 	data_ca_name: str = None
 	data_ca: str = None
 	data_disk_use: bool = False
+	data_pool_min: int = 10
+	data_pool_max: int = 100
+	data_read_preference: str = 'primary'
+	data_max_staleness: int = -1
+	data_facet_read: bool = False
+	data_query_cache: int = 1000
+	data_extn_cache_size: int = 32 * 1024 * 1024
+	data_stream_batch: int = 100
+	data_watch_shared: bool = True
+	data_watch_retries: int = 3
+	data_watch_coalesce_size: int = 100
+	data_watch_live_limit: int = 100
+	data_watch_lookup_limit: int = 10
+	data_total: Union[bool, int, str] = 'exact'
+	data_total_cap: int = 1000
+	data_deleted_flag_batch: int = 1000
+	data_index_advisor: bool = False
+	data_index_advisor_shapes: int = 100
+	data_index_advisor_min_count: int = 100
+	data_index_advisor_create: bool = False
+	data_index_advisor_period: int = 3600
+	data_slow_query_threshold: float = 1.0
+	data_slow_query_explain: float = 0.1
+	data_slow_query_size: int = 16 * 1024 * 1024
 
 	data_azure_mongo: bool = False
+	data_azure_mongo_bulk: bool = True
+	data_azure_mongo_concurrency: int = 10
+	data_azure_mongo_retries: int = 5
 
 	email_auth: Dict[str, str] = {}
 
@@ -255,6 +282,7 @@ class Config:
 		anon_session = cls.compile_anon_session()
 		anon_session['user'] = DictObj(anon_user)
 		cls._sys_conn = Data.create_conn()
+		await Data.warm_up_conn()
 		cls._sys_env = {
 			'conn': cls._sys_conn,
 			'REMOTE_ADDR': '127.0.0.1',
@@ -704,9 +732,15 @@ class Config:
 		logger.debug('Testing data indexes')
 		for index in cls.data_indexes:
 			logger.debug(f'Attempting to create data index: {index}')
-			cls._sys_conn[cls.data_name][index['collection']].create_index(
-				index['index']
-			)
+			# [DOC] Include __deleted flag as compound index prefix
+			if index.get('deleted') == 'compound':
+				cls._sys_conn[cls.data_name][index['collection']].create_index(
+					[('__deleted', 1), *index['index']]
+				)
+			else:
+				cls._sys_conn[cls.data_name][index['collection']].create_index(
+					index['index']
+				)
 		logger.debug(
 			'Creating \'var\', \'type\', \'user\' data indexes for settings collections.'
 		)
@@ -719,6 +753,18 @@ class Config:
 		cls._sys_conn[cls.data_name]['analytics'].create_index([('user', 1)])
 		cls._sys_conn[cls.data_name]['analytics'].create_index([('event', 1)])
 		cls._sys_conn[cls.data_name]['analytics'].create_index([('subevent', 1)])
+		# [DOC] Create capped collection for slow queries log
+		if (
+			'__slow_queries'
+			not in await cls._sys_conn[cls.data_name].list_collection_names()
+		):
+			logger.debug('Creating \'__slow_queries\' capped collection.')
+			try:
+				await cls._sys_conn[cls.data_name].create_collection(
+					'__slow_queries', capped=True, size=cls.data_slow_query_size
+				)
+			except Exception as err:
+				logger.error(err)
 		logger.debug('Creating \'__deleted\' data indexes for all collections.')
 		for module in cls.modules:
 			if cls.modules[module].collection:
@@ -727,7 +773,18 @@ class Config:
 				)
 				cls._sys_conn[cls.data_name][
 					cls.modules[module].collection
-				].create_index([('__deleted', 1)])
+				].create_index([('__deleted', 1), ('_id', -1)])
+		logger.debug('Creating access principals data indexes for ACCESS attrs.')
+		for module in cls.modules:
+			if cls.modules[module].collection:
+				for attr in cls.modules[module].attrs.keys():
+					if cls.modules[module].attrs[attr]._type == 'ACCESS':
+						logger.debug(
+							f'Attempting to create access principals data index for attr \'{attr}\' of collection: {cls.modules[module].collection}'
+						)
+						cls._sys_conn[cls.data_name][
+							cls.modules[module].collection
+						].create_index([(f'__principals.{attr}', 1)])
 		if cls.realm:
 			logger.debug('Creating \'realm\' data indexes for all collections.')
 			for module in cls.modules:
@@ -1,18 +1,58 @@
 from config import Config
 from enums import Event, DELETE_STRATEGY
-from classes import DictObj, BaseModel, Query, EXTN, ATTR, ATTR_MOD, LIMP_DOC
+from classes import DictObj, BaseModel, Query, EXTN, ATTR, ATTR_MOD, LIMP_DOC, JSONEncoder
 from utils import extract_attr, set_attr
 
 from motor.motor_asyncio import AsyncIOMotorClient
-from bson import ObjectId
+from pymongo import monitoring, UpdateOne, UpdateMany, DeleteOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import (
+	Primary,
+	PrimaryPreferred,
+	Secondary,
+	SecondaryPreferred,
+	Nearest,
+)
+from bson import ObjectId, Timestamp
 
 from types import GeneratorType
-from typing import Dict, Union, List, Tuple, Any
+from typing import Dict, Union, List, Tuple, Set, Any
 
-import os, logging, re, datetime, copy
+import os, logging, re, datetime, copy, collections, asyncio, random, time, contextvars
 
 logger = logging.getLogger('limp')
 
+# [DOC] Error codes Azure Cosmos DB returns when request rate is throttled
+AZURE_THROTTLE_CODES = [16500, 429]
+# [DOC] Error codes returned when resume token of change stream is no longer in oplog
+CHANGE_STREAM_HISTORY_LOST_CODES = [260, 280, 286]
+
+# [DOC] Match opers implemented for in-process matching of change events of shared change streams
+MATCH_OPERS = {
+	'$eq',
+	'$ne',
+	'$gt',
+	'$gte',
+	'$lt',
+	'$lte',
+	'$in',
+	'$nin',
+	'$all',
+	'$exists',
+	'$regex',
+	'$options',
+}
+
+# [DOC] Read preferences modes, that can be set for modules, methods, and Config.data_read_preference
+READ_PREFERENCES = {
+	'primary': Primary,
+	'primaryPreferred': PrimaryPreferred,
+	'secondary': Secondary,
+	'secondaryPreferred': SecondaryPreferred,
+	'nearest': Nearest,
+}
+
 
 class UnknownDeleteStrategyException(Exception):
 	pass
@@ -22,10 +62,215 @@ class InvalidQueryException(Exception):
 	pass
 
 
+class AzureWriteException(Exception):
+	pass
+
+
+class DataPoolListener(monitoring.ConnectionPoolListener):
+	stats: Dict[str, int]
+
+	def __init__(self):
+		self.stats = {
+			'created': 0,
+			'closed': 0,
+			'checked_out': 0,
+			'checked_in': 0,
+			'check_out_failed': 0,
+			'cleared': 0,
+		}
+
+	def pool_created(self, event):
+		pass
+
+	def pool_ready(self, event):
+		pass
+
+	def pool_cleared(self, event):
+		self.stats['cleared'] += 1
+
+	def pool_closed(self, event):
+		pass
+
+	def connection_created(self, event):
+		self.stats['created'] += 1
+
+	def connection_ready(self, event):
+		pass
+
+	def connection_closed(self, event):
+		self.stats['closed'] += 1
+
+	def connection_check_out_started(self, event):
+		pass
+
+	def connection_check_out_failed(self, event):
+		self.stats['check_out_failed'] += 1
+
+	def connection_checked_out(self, event):
+		self.stats['checked_out'] += 1
+
+	def connection_checked_in(self, event):
+		self.stats['checked_in'] += 1
+
+
+class DataConn:
+	_client: AsyncIOMotorClient
+
+	def __repr__(self):
+		return f'<DataConn:{self._client}>'
+
+	def __init__(self, *, client: AsyncIOMotorClient):
+		self._client = client
+
+	def __getitem__(self, name: str):
+		return self._client[name]
+
+	def __getattr__(self, attr: str):
+		return getattr(self._client, attr)
+
+	def close(self):
+		# [DOC] Shared client is kept open for other handles. Closing handle is a no-op
+		pass
+
+
+class DataWatch:
+	env: Dict[str, Any]
+	stream_key: Tuple[str, str]
+	pipeline: List[Dict[str, Any]]
+	attrs: Dict[str, ATTR]
+	skip_extn: bool
+	project: bool
+	delta: bool
+	live: Union[Dict[str, int], None]
+	lookup_attrs: Union[Set[str], None]
+	queue: asyncio.Queue
+	opened: asyncio.Event
+
+	def __repr__(self):
+		return f'<DataWatch:{self.stream_key}>'
+
+	def __init__(
+		self,
+		*,
+		env: Dict[str, Any],
+		stream_key: Tuple[str, str],
+		pipeline: List[Dict[str, Any]],
+		attrs: Dict[str, ATTR],
+		skip_extn: bool,
+		project: bool,
+		delta: bool,
+		live: Union[Dict[str, int], None],
+		lookup_attrs: Union[Set[str], None],
+	):
+		self.env = env
+		self.stream_key = stream_key
+		self.pipeline = pipeline
+		self.attrs = attrs
+		self.skip_extn = skip_extn
+		self.project = project
+		self.delta = delta
+		self.live = live
+		self.lookup_attrs = lookup_attrs
+		self.queue = asyncio.Queue()
+		self.opened = asyncio.Event()
+
+	async def close(self):
+		# [DOC] Closing subscriber ends its watch generator, which unsubscribes it from shared stream
+		self.queue.put_nowait(None)
+
+
+class QUERY_PARAM:
+	index: int
+	path: List[Union[str, int]]
+	conv: str
+	val_type: str
+	val_keys: Tuple[str, ...]
+
+	def __init__(
+		self,
+		*,
+		index: int,
+		path: List[Union[str, int]] = None,
+		conv: str = None,
+		val: Any = None,
+	):
+		self.index = index
+		self.path = path or []
+		self.conv = conv
+		self.val_type = type(val).__name__
+		self.val_keys = ()
+		if type(val) == dict:
+			self.val_keys = tuple(val.keys())
+
+	@property
+	def shape(self) -> Tuple[Any, ...]:
+		return (self.val_type, self.val_keys)
+
+	def derive(
+		self, *, path: List[Union[str, int]] = None, conv: str = None
+	) -> 'QUERY_PARAM':
+		param = copy.copy(self)
+		param.path = self.path + (path or [])
+		param.conv = conv
+		return param
+
+	def bind(self, *, query_values: List[Any]) -> Any:
+		val = query_values[self.index]
+		for path_part in self.path:
+			val = val[path_part]
+		try:
+			if self.conv == 'id':
+				val = ObjectId(val)
+			elif self.conv == 'id_list':
+				val = [ObjectId(child_val) for child_val in val]
+			elif self.conv == 'regex':
+				val = re.compile(val, re.RegexFlag.IGNORECASE)
+			elif self.conv == 'principals':
+				val = [
+					'anon',
+					f'user:{val["$__user"]}',
+					*[f'group:{group}' for group in val['$__groups']],
+				]
+		except:
+			logger.warning(f'Failed to convert attr to {self.conv} type: {val}')
+		return val
+
+	def __repr__(self):
+		return f'<QUERY_PARAM:{self.index}:{self.path}:{self.conv}>'
+
+
 class Data:
+	_conn: AsyncIOMotorClient = None
+	_conn_listener: DataPoolListener = None
+	_query_cache: 'collections.OrderedDict[Tuple, List[Any]]' = collections.OrderedDict()
+	_query_cache_stats: Dict[str, int] = {'hits': 0, 'misses': 0}
+	_extn_cache: 'collections.OrderedDict[Tuple[str, str], Dict[str, Any]]' = collections.OrderedDict()
+	_extn_cache_size: int = 0
+	_extn_cache_gens: Dict[str, int] = {}
+	_extn_cache_stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'invalidations': 0}
+	_access_principals_collections: List[str] = []
+	_watch_streams: Dict[Tuple[str, str], Dict[str, Any]] = {}
+	_query_shapes: Dict[str, 'collections.OrderedDict[Tuple, Dict[str, Any]]'] = {}
+	_call_ctx: contextvars.ContextVar = contextvars.ContextVar(
+		'limp_data_call_ctx', default=None
+	)
+
+	@classmethod
+	def create_conn(cls) -> DataConn:
+		# [DOC] All handles share one pooled client per process, created on first use
+		if not cls._conn:
+			cls._conn_listener = DataPoolListener()
+			cls._conn = cls._create_client()
+		return DataConn(client=cls._conn)
+
 	@classmethod
-	def create_conn(cls) -> AsyncIOMotorClient:
-		connection_config = {'ssl': Config.data_ssl}
+	def _create_client(cls) -> AsyncIOMotorClient:
+		connection_config = {
+			'ssl': Config.data_ssl,
+			'minPoolSize': Config.data_pool_min,
+			'maxPoolSize': Config.data_pool_max,
+			'event_listeners': [cls._conn_listener],
+		}
 		if Config.data_ca:
 			__location__ = os.path.realpath(
 				os.path.join(os.getcwd(), os.path.dirname(__file__))
@@ -55,20 +300,43 @@ class Data:
 			)
 		return conn
 
+	@classmethod
+	async def warm_up_conn(cls):
+		# [DOC] Open connections up to data_pool_min ahead of first calls with concurrent pings
+		conn = cls.create_conn()
+		try:
+			await asyncio.gather(
+				*[
+					conn.admin.command('ping')
+					for _ in range(max(1, Config.data_pool_min))
+				]
+			)
+		except Exception as e:
+			logger.error(f'Failed to warm up data connection pool. Error: {e}')
+
+	@classmethod
+	def conn_stats(cls) -> Dict[str, int]:
+		stats = {
+			'pool_min': Config.data_pool_min,
+			'pool_max': Config.data_pool_max,
+		}
+		if cls._conn_listener:
+			stats.update(cls._conn_listener.stats)
+			stats['open'] = (
+				cls._conn_listener.stats['created'] - cls._conn_listener.stats['closed']
+			)
+			stats['in_use'] = (
+				cls._conn_listener.stats['checked_out']
+				- cls._conn_listener.stats['checked_in']
+			)
+		return stats
+
 	@classmethod
 	def _compile_query(
 		cls, *, collection: str, attrs: Dict[str, ATTR], query: Query, watch_mode: bool
-	) -> Tuple[int, int, Dict[str, int], List[Dict[str, Union[str, int]]], List[Any]]:
-		aggregate_prefix = [
-			{
-				'$match': {
-					'$or': [{'__deleted': {'$exists': False}}, {'__deleted': False}]
-				}
-			}
-		]
-		aggregate_suffix = []
-		aggregate_query = [{'$match': {'$and': []}}]
-		aggregate_match = aggregate_query[0]['$match']['$and']
+	) -> Tuple[
+		int, int, Dict[str, int], List[Dict[str, Union[str, int]]], List[Any], List[Any]
+	]:
 		skip: int = None
 		limit: int = None
 		sort: Dict[str, int] = {'_id': -1}
@@ -77,48 +345,190 @@ class Data:
 
 		if not isinstance(query, Query):
 			raise InvalidQueryException(f'Query of type \'{type(query)}\' is invalid.')
-		query = copy.deepcopy(query)
 
 		if '$skip' in query:
 			skip = query['$skip']
-			del query['$skip']
 		if '$limit' in query:
 			limit = query['$limit']
-			del query['$limit']
 		if '$sort' in query:
 			sort = query['$sort']
-			del query['$sort']
 		if '$group' in query:
 			group = query['$group']
-			del query['$group']
+
+		# [DOC] Split query into its shape and values. Shape is used as key for compiled pipelines cache
+		query_values: List[Any] = []
+		query_shape, query_params = cls._parameterise_query(
+			query=query, query_values=query_values
+		)
+		query_key = (
+			collection,
+			id(attrs),
+			watch_mode,
+			collection in cls._access_principals_collections,
+			query_shape,
+		)
+
+		if query_key in cls._query_cache.keys():
+			cls._query_cache.move_to_end(query_key)
+			cls._query_cache_stats['hits'] += 1
+			aggregate_template = cls._query_cache[query_key]
+		else:
+			cls._query_cache_stats['misses'] += 1
+			aggregate_template = cls._compile_query_template(
+				collection=collection,
+				attrs=attrs,
+				query_params=query_params,
+				watch_mode=watch_mode,
+			)
+			if Config.data_query_cache:
+				cls._query_cache[query_key] = aggregate_template
+				while len(cls._query_cache) > Config.data_query_cache:
+					cls._query_cache.popitem(last=False)
+
+		aggregate_query, aggregate_project = cls._bind_query_params(
+			template=aggregate_template, query_values=query_values
+		)
+		return (skip, limit, sort, group, aggregate_query, aggregate_project)
+
+	@classmethod
+	def query_cache_stats(cls) -> Dict[str, int]:
+		return {
+			'size': len(cls._query_cache),
+			'max_size': Config.data_query_cache,
+			**cls._query_cache_stats,
+		}
+
+	@classmethod
+	def _parameterise_query(
+		cls, *, query: Query, query_values: List[Any]
+	) -> Tuple[Tuple, Dict[str, Any]]:
+		query_shape = []
+		query_params = {'steps': []}
+		for step in query:
+			step_shape, step_params = cls._parameterise_query_step(
+				step=step, query_values=query_values
+			)
+			query_shape.append(step_shape)
+			query_params['steps'].append(step_params)
+
 		if '$search' in query:
+			query_params['$search'] = QUERY_PARAM(
+				index=len(query_values), val=query['$search']
+			)
+			query_values.append(query['$search'])
+			query_shape.append(('$search',))
+		if '$geo_near' in query:
+			query_params['$geo_near'] = {
+				'attr': query['$geo_near']['attr'],
+				'val': QUERY_PARAM(index=len(query_values), path=['val']),
+				'dist': QUERY_PARAM(index=len(query_values), path=['dist']),
+			}
+			query_values.append(query['$geo_near'])
+			query_shape.append(('$geo_near', query['$geo_near']['attr']))
+		if '$attrs' in query and type(query['$attrs']) == list:
+			query_params['$attrs'] = query['$attrs']
+			query_shape.append(('$attrs', tuple(query['$attrs'])))
+
+		return (tuple(query_shape), query_params)
+
+	@classmethod
+	def _parameterise_query_step(
+		cls, *, step: Union[Dict, List], query_values: List[Any]
+	) -> Tuple[Tuple, Union[Dict, List]]:
+		if type(step) == dict:
+			step_shape = []
+			step_params = {}
+			for attr in step.keys():
+				if attr.startswith('__or'):
+					child_shape, step_params[attr] = cls._parameterise_query_step(
+						step=step[attr], query_values=query_values
+					)
+				else:
+					step_params[attr] = QUERY_PARAM(
+						index=len(query_values), val=step[attr]
+					)
+					query_values.append(step[attr])
+					child_shape = step_params[attr].shape
+				step_shape.append((attr, child_shape))
+			return (('dict', tuple(step_shape)), step_params)
+		elif type(step) == list:
+			step_shape = []
+			step_params = []
+			for child_step in step:
+				child_shape, child_params = cls._parameterise_query_step(
+					step=child_step, query_values=query_values
+				)
+				step_shape.append(child_shape)
+				step_params.append(child_params)
+			return (('list', tuple(step_shape)), step_params)
+		return ((type(step).__name__,), step)
+
+	@classmethod
+	def _bind_query_params(cls, *, template: Any, query_values: List[Any]) -> Any:
+		if type(template) == QUERY_PARAM:
+			return template.bind(query_values=query_values)
+		elif type(template) == dict:
+			return {
+				key: cls._bind_query_params(
+					template=template[key], query_values=query_values
+				)
+				for key in template.keys()
+			}
+		elif type(template) == list:
+			return [
+				cls._bind_query_params(template=item, query_values=query_values)
+				for item in template
+			]
+		return template
+
+	@classmethod
+	def _compile_query_template(
+		cls,
+		*,
+		collection: str,
+		attrs: Dict[str, ATTR],
+		query_params: Dict[str, Any],
+		watch_mode: bool,
+	) -> List[List[Any]]:
+		# [DOC] Single $ne match serves reads from (__deleted, ...) compound indexes, while docs written without __deleted flag, by older processes or other writers, are still matched
+		aggregate_prefix = [{'$match': {'__deleted': {'$ne': True}}}]
+		# [DOC] Change events have no top-level __deleted, so watch keeps original match
+		if watch_mode:
+			aggregate_prefix = [
+				{
+					'$match': {
+						'$or': [{'__deleted': {'$exists': False}}, {'__deleted': False}]
+					}
+				}
+			]
+		aggregate_suffix = []
+		aggregate_query = [{'$match': {'$and': []}}]
+		aggregate_match = aggregate_query[0]['$match']['$and']
+
+		if '$search' in query_params.keys():
 			aggregate_prefix.insert(
-				0, {'$match': {'$text': {'$search': query['$search']}}}
+				0, {'$match': {'$text': {'$search': query_params['$search']}}}
 			)
-			project_query = {attr: '$' + attr for attr in attrs.keys()}
-			project_query['_id'] = '$_id'
-			project_query['__score'] = {'$meta': 'textScore'}
-			aggregate_suffix.append({'$project': project_query})
+			aggregate_suffix.append({'$addFields': {'__score': {'$meta': 'textScore'}}})
 			aggregate_suffix.append({'$match': {'__score': {'$gt': 0.5}}})
-			del query['$search']
-		if '$geo_near' in query:
+		if '$geo_near' in query_params.keys():
 			aggregate_prefix.insert(
 				0,
 				{
 					'$geoNear': {
 						'near': {
 							'type': 'Point',
-							'coordinates': query['$geo_near']['val'],
+							'coordinates': query_params['$geo_near']['val'],
 						},
-						'distanceField': query['$geo_near']['attr'] + '.__distance',
-						'maxDistance': query['$geo_near']['dist'],
+						'distanceField': query_params['$geo_near']['attr']
+						+ '.__distance',
+						'maxDistance': query_params['$geo_near']['dist'],
 						'spherical': True,
 					}
 				},
 			)
-			del query['$geo_near']
 
-		for step in query:
+		for step in query_params['steps']:
 			cls._compile_query_step(
 				aggregate_prefix=aggregate_prefix,
 				aggregate_suffix=aggregate_suffix,
@@ -129,39 +539,67 @@ class Data:
 				watch_mode=watch_mode,
 			)
 
-		if '$attrs' in query and type(query['$attrs']) == list:
-			aggregate_suffix.append(
-				{
-					'$group': {
-						'_id': '$_id',
-						**{
-							attr: {'$first': f'${attr}'}
-							for attr in query['$attrs']
-							if attr in attrs.keys()
-						},
-					}
-				}
-			)
+		if '$attrs' in query_params.keys():
+			project_attrs = [
+				attr for attr in query_params['$attrs'] if attr in attrs.keys()
+			]
 		else:
+			project_attrs = list(attrs.keys())
+
+		logger.debug(
+			f'compiled query, aggregate_prefix:{aggregate_prefix}, aggregate_suffix:{aggregate_suffix}, aggregate_match:{aggregate_match}'
+		)
+		if len(aggregate_match) == 1:
+			aggregate_query = [{'$match': aggregate_match[0]}]
+		elif len(aggregate_match) == 0:
+			aggregate_query = []
+
+		fan_out = False
+		for stage in aggregate_prefix:
+			if '$unwind' in stage.keys():
+				if stage['$unwind']['__fan_out']:
+					fan_out = True
+				del stage['$unwind']['__fan_out']
+
+		# [DOC] Change streams are filtered by match stages only, and projected to requested attrs
+		if watch_mode:
+			watch_project = []
+			if '$attrs' in query_params.keys():
+				watch_project = [
+					{
+						'$project': {
+							'operationType': 1,
+							'documentKey': 1,
+							'updateDescription': 1,
+							'fullDocument._id': 1,
+							**{f'fullDocument.{attr}': 1 for attr in project_attrs},
+						}
+					}
+				]
+			return [aggregate_prefix + aggregate_query, watch_project]
+
+		# [DOC] Rows are only duplicated by $unwind of list lookups, de-duplicate them before paging
+		if fan_out:
 			aggregate_suffix.append(
 				{
 					'$group': {
 						'_id': '$_id',
-						**{attr: {'$first': f'${attr}'} for attr in attrs.keys()},
+						**{attr: {'$first': f'${attr}'} for attr in project_attrs},
 					}
 				}
 			)
 
-		logger.debug(
-			f'processed query, aggregate_prefix:{aggregate_prefix}, aggregate_suffix:{aggregate_suffix}, aggregate_match:{aggregate_match}'
-		)
-		if len(aggregate_match) == 1:
-			aggregate_query = [{'$match': aggregate_match[0]}]
-		elif len(aggregate_match) == 0:
-			aggregate_query = []
+		# [DOC] Project is appended by read after sort and paging, so sort, skip and limit could use indexes
+		aggregate_project = [
+			{
+				'$project': {
+					'_id': 1,
+					**{attr: 1 for attr in project_attrs},
+				}
+			}
+		]
 
-		aggregate_query = aggregate_prefix + aggregate_query + aggregate_suffix
-		return (skip, limit, sort, group, aggregate_query)
+		return [aggregate_prefix + aggregate_query + aggregate_suffix, aggregate_project]
 
 	@classmethod
 	def _compile_query_step(
@@ -198,6 +636,9 @@ class Data:
 							child_child_aggregate_query['$or']
 						)
 				else:
+					# [DOC] step[attr] is QUERY_PARAM placeholder, carrying only the shape of value
+					step_param: QUERY_PARAM = step[attr]
+					step_val = step_param
 					# [DOC] Add extn query when required
 					if (
 						attr.find('.') != -1
@@ -210,11 +651,12 @@ class Data:
 						].attrs
 
 						# [DOC] Don't attempt to extn attr that is already extn'ed
+						lookup_attr = f'__lookup_{attr.split(".")[0]}'
 						lookup_query = False
 						for stage in aggregate_prefix:
 							if (
 								'$lookup' in stage.keys()
-								and stage['$lookup']['as'] == attr.split('.')[0]
+								and stage['$lookup']['as'] == lookup_attr
 							):
 								lookup_query = True
 								break
@@ -222,27 +664,28 @@ class Data:
 							extn_collection = Config.modules[
 								attrs[attr.split('.')[0]]._extn.module
 							].collection
+							# [DOC] Lookup into separate attr, so the original attr value is kept
 							aggregate_prefix.append(
 								{
 									'$lookup': {
 										'from': extn_collection,
 										'localField': attr.split('.')[0],
 										'foreignField': '_id',
-										'as': attr.split('.')[0],
+										'as': lookup_attr,
 									}
 								}
 							)
+							# [DOC] Lookup of list attr fans out rows when unwound. Mark it for de-duplication
 							aggregate_prefix.append(
-								{'$unwind': f'${attr.split(".")[0]}'}
+								{
+									'$unwind': {
+										'path': f'${lookup_attr}',
+										'__fan_out': attrs[attr.split('.')[0]]._type
+										== 'LIST',
+									}
+								}
 							)
-							group_query = {
-								attr: {'$first': f'${attr}'} for attr in attrs.keys()
-							}
-							group_query[attr.split('.')[0]] = {
-								'$first': f'${attr.split(".")[0]}._id'
-							}
-							group_query['_id'] = '$_id'
-							aggregate_suffix.append({'$group': group_query})
+						attr = f'{lookup_attr}.{attr.split(".", 1)[1]}'
 					else:
 						step_attr = attr
 						step_attrs = attrs
@@ -252,132 +695,103 @@ class Data:
 						step_attr in step_attrs.keys()
 						and step_attrs[step_attr]._type == 'ID'
 					):
-						try:
-							if type(step[attr]) == dict and '$in' in step[attr].keys():
-								step[attr] = {
-									'$in': [
-										ObjectId(child_attr)
-										for child_attr in step[attr]['$in']
-									]
-								}
-							elif type(step[attr]) == str:
-								step[attr] = ObjectId(step[attr])
-						except:
-							logger.warning(
-								f'Failed to convert attr to id type: {step[attr]}'
-							)
+						if step_param.val_type == 'dict' and '$in' in step_param.val_keys:
+							step_val = {
+								'$in': step_param.derive(path=['$in'], conv='id_list')
+							}
+						elif step_param.val_type == 'str':
+							step_val = step_param.derive(conv='id')
 					elif (
 						step_attr in step_attrs.keys()
 						and step_attrs[step_attr]._type == 'list'
 						and step_attrs[step_attr]._args['list'][0]._type == 'ID'
 					):
-						try:
-							if type(step[attr]) == list:
-								step[attr] = [
-									ObjectId(child_attr) for child_attr in step[attr]
-								]
-							elif (
-								type(step[attr]) == dict and '$in' in step[attr].keys()
-							):
-								step[attr] = {
-									'$in': [
-										ObjectId(child_attr)
-										for child_attr in step[attr]['$in']
-									]
-								}
-							elif type(step[attr]) == str:
-								step[attr] = ObjectId(step[attr])
-						except:
-							logger.warning(
-								f'Failed to convert attr to id type: {step[attr]}'
-							)
+						if step_param.val_type == 'list':
+							step_val = step_param.derive(conv='id_list')
+						elif (
+							step_param.val_type == 'dict' and '$in' in step_param.val_keys
+						):
+							step_val = {
+								'$in': step_param.derive(path=['$in'], conv='id_list')
+							}
+						elif step_param.val_type == 'str':
+							step_val = step_param.derive(conv='id')
 					elif step_attr == '_id':
-						try:
-							if type(step[attr]) == str:
-								step[attr] = ObjectId(step[attr])
-							elif type(step[attr]) == list:
-								step[attr] = [
-									ObjectId(child_attr) for child_attr in step[attr]
-								]
-							elif (
-								type(step[attr]) == dict and '$in' in step[attr].keys()
-							):
-								step[attr] = {
-									'$in': [
-										ObjectId(child_attr)
-										for child_attr in step[attr]['$in']
-									]
-								}
-						except:
-							logger.warning(
-								f'Failed to convert attr to id type: {step[attr]}'
-							)
+						if step_param.val_type == 'str':
+							step_val = step_param.derive(conv='id')
+						elif step_param.val_type == 'list':
+							step_val = step_param.derive(conv='id_list')
+						elif (
+							step_param.val_type == 'dict' and '$in' in step_param.val_keys
+						):
+							step_val = {
+								'$in': step_param.derive(path=['$in'], conv='id_list')
+							}
 					# [DOC] Check for access sepcial attrs
 					elif (
 						step_attr in step_attrs.keys()
 						and step_attrs[step_attr]._type == 'ACCESS'
 					):
-						access_query = [
-							{
-								'$project': {
-									'__user': '$user',
-									'__access.anon': f'${attr}.anon',
-									'__access.users': {
-										'$in': [
-											ObjectId(step[attr]['$__user']),
-											f'${attr}.users',
-										]
+						doc_prefix = 'fullDocument.' if watch_mode else ''
+						# [DOC] Match access attr directly, rather than projecting access flags, so indexes could be used
+						access_user = step_param.derive(path=['$__user'], conv='id')
+						access_match = {
+							'$or': [
+								{f'{doc_prefix}user': access_user},
+								{f'{doc_prefix}{attr}.anon': True},
+								{f'{doc_prefix}{attr}.users': access_user},
+								{
+									f'{doc_prefix}{attr}.groups': {
+										'$in': step_param.derive(path=['$__groups'])
+									}
+								},
+							]
+						}
+						# [DOC] Once collection access principals are migrated, match them with single indexed $in, falling back to access attr for docs written without principals
+						if collection in cls._access_principals_collections:
+							access_match = {
+								'$or': [
+									{
+										f'{doc_prefix}__principals.{attr}': {
+											'$in': step_param.derive(conv='principals')
+										}
 									},
-									'__access.groups': {
-										'$or': [
-											{'$in': [group, f'${attr}.groups']}
-											for group in step[attr]['$__groups']
+									{
+										'$and': [
+											{
+												f'{doc_prefix}__principals.{attr}': {
+													'$exists': False
+												}
+											},
+											access_match,
 										]
 									},
-								}
-							},
-							{
-								'$match': {
-									'$or': [
-										{'__user': ObjectId(step[attr]['$__user'])},
-										{'__access.anon': True},
-										{'__access.users': True},
-										{'__access.groups': True},
-									]
-								}
-							},
-						]
-						access_query[0]['$project'].update(
-							{attr: '$' + attr for attr in attrs.keys()}
-						)
-
-						aggregate_prefix.append(access_query[0])
-						step[attr] = access_query[1]
+								]
+							}
+						step_val = {'$match': access_match}
 					# [DOC] Check for query oper
-					if type(step[attr]) == dict:
+					if step_param.val_type == 'dict':
 						# [DOC] Check for $bet query oper
-						if '$bet' in step[attr].keys():
-							step[attr] = {
-								'$gte': step[attr]['$bet'][0],
-								'$lte': step[attr]['$bet'][1],
+						if '$bet' in step_param.val_keys:
+							step_val = {
+								'$gte': step_param.derive(path=['$bet', 0]),
+								'$lte': step_param.derive(path=['$bet', 1]),
 							}
 						# [DOC] Check for $regex query oper
-						elif '$regex' in step[attr].keys():
-							step[attr] = {
-								'$regex': re.compile(
-									step[attr]['$regex'], re.RegexFlag.IGNORECASE
-								)
+						elif '$regex' in step_param.val_keys:
+							step_val = {
+								'$regex': step_param.derive(path=['$regex'], conv='regex')
 							}
 
-					if type(step[attr]) == dict and '$match' in step[attr].keys():
-						child_aggregate_query['$and'].append(step[attr]['$match'])
+					if type(step_val) == dict and '$match' in step_val.keys():
+						child_aggregate_query['$and'].append(step_val['$match'])
 					else:
 						if watch_mode:
 							child_aggregate_query['$and'].append(
-								{f'fullDocument.{attr}': step[attr]}
+								{f'fullDocument.{attr}': step_val}
 							)
 						else:
-							child_aggregate_query['$and'].append({attr: step[attr]})
+							child_aggregate_query['$and'].append({attr: step_val})
 			if len(child_aggregate_query['$and']) == 1:
 				aggregate_match.append(child_aggregate_query['$and'][0])
 			elif len(child_aggregate_query['$and']) > 1:
@@ -407,9 +821,13 @@ class Data:
 		collection: str,
 		attrs: Dict[str, ATTR],
 		doc: LIMP_DOC,
-		extn_models: Dict[str, BaseModel] = {},
+		extn_targets: List[Dict[str, Any]] = None,
 		skip_extn: bool = False,
 	) -> Dict[str, Any]:
+		# [DOC] If no extn_targets is passed, extns of doc are resolved before returning
+		extend_doc = extn_targets == None
+		if extend_doc:
+			extn_targets = []
 		# [DOC] Process doc attrs
 		for attr in attrs.keys():
 			if attrs[attr]._type == 'LOCALE':
@@ -421,14 +839,21 @@ class Data:
 						for locale in Config.locales
 					}
 			if not skip_extn:
-				await Data._extend_attr(
-					doc=doc, scope=doc, attr_name=attr, attr_type=attrs[attr], env=env
+				cls._extend_attr(
+					doc=doc,
+					scope=doc,
+					attr_name=attr,
+					attr_type=attrs[attr],
+					env=env,
+					extn_targets=extn_targets,
 				)
 		# [DOC] Attempt to extned the doc per extns
+		if extend_doc:
+			await cls._extend_docs(env=env, extn_targets=extn_targets)
 		return doc
 
 	@classmethod
-	async def _extend_attr(
+	def _extend_attr(
 		cls,
 		*,
 		doc: LIMP_DOC,
@@ -436,11 +861,8 @@ class Data:
 		attr_name: str,
 		attr_type: ATTR,
 		env: Dict[str, Any],
-		extn_models: Dict[str, BaseModel] = None,
+		extn_targets: List[Dict[str, Any]],
 	):
-		if not extn_models:
-			extn_models = {}
-
 		if type(scope) == dict and attr_name not in scope.keys():
 			return
 		
@@ -448,23 +870,23 @@ class Data:
 			if scope[attr_name] and type(scope[attr_name]) == dict:
 				if '__key' in attr_type._args['dict'].keys():
 					for child_attr in scope[attr_name].keys():
-						await cls._extend_attr(
+						cls._extend_attr(
 							doc=doc,
 							scope=scope[attr_name],
 							attr_name=child_attr,
 							attr_type=attr_type._args['dict']['__val'],
 							env=env,
-							extn_models=extn_models,
+							extn_targets=extn_targets,
 						)
 				else:
 					for child_attr in attr_type._args['dict'].keys():
-						await cls._extend_attr(
+						cls._extend_attr(
 							doc=doc,
 							scope=scope[attr_name],
 							attr_name=child_attr,
 							attr_type=attr_type._args['dict'][child_attr],
 							env=env,
-							extn_models=extn_models,
+							extn_targets=extn_targets,
 						)
 		
 		elif attr_type._type == 'LIST':
@@ -475,35 +897,36 @@ class Data:
 							if type(child_scope) == dict:
 								if '__key' in child_attr._args['dict'].keys():
 									for child_child_attr in child_scope.keys():
-										await cls._extend_attr(
+										cls._extend_attr(
 											doc=doc,
 											scope=child_scope,
 											attr_name=child_child_attr,
 											attr_type=child_attr._args['dict']['__val'],
 											env=env,
-											extn_models=extn_models,
+											extn_targets=extn_targets,
 										)
 								else:
 									for child_child_attr in child_attr._args['dict'].keys():
-										await cls._extend_attr(
+										cls._extend_attr(
 											doc=doc,
 											scope=child_scope,
 											attr_name=child_child_attr,
 											attr_type=child_attr._args['dict'][child_child_attr],
 											env=env,
-											extn_models=extn_models,
+											extn_targets=extn_targets,
 										)
 					elif child_attr._type == 'ID':
 						for i in range(len(scope[attr_name])):
-							await cls._extend_attr(
+							cls._extend_attr(
 								doc=doc,
 								scope=scope[attr_name],
 								attr_name=i,
 								attr_type=child_attr,
 								env=env,
-								extn_models=extn_models,
+								extn_targets=extn_targets,
 							)
 
+		extn_val = None
 		if type(attr_type._extn) == ATTR_MOD:
 			if attr_type._extn.condition(
 				skip_events=[], env=env, query=[], doc=doc, scope=scope[attr_name]
@@ -511,62 +934,219 @@ class Data:
 				extn_set = attr_type._extn.default(
 					skip_events=[], env=env, query=[], doc=doc, scope=scope[attr_name]
 				)
-				if type(extn_set['__val']) == ObjectId:
-					scope[attr_name] = await cls._extend_doc(
-						env=env,
-						doc=doc,
-						attr=scope[attr_name],
-						extn_id=extn_set['__val'],
-						extn=extn_set['__extn'],
-						extn_models=extn_models,
+				extn_val = extn_set['__val']
+				extn = extn_set['__extn']
+		elif type(attr_type._extn) == EXTN:
+			extn_val = scope[attr_name]
+			extn = attr_type._extn
+
+		# [DOC] Register extn targets for _extend_docs to fill them once all docs are processed
+		if type(extn_val) == ObjectId:
+			extn_targets.append(
+				{
+					'doc': doc,
+					'attr': scope[attr_name],
+					'scope': scope,
+					'key': attr_name,
+					'extn_id': extn_val,
+					'extn': extn,
+				}
+			)
+		elif type(extn_val) == list:
+			attr_val = scope[attr_name]
+			scope[attr_name] = list(extn_val)
+			for i in range(len(extn_val)):
+				extn_targets.append(
+					{
+						'doc': doc,
+						'attr': attr_val,
+						'scope': scope[attr_name],
+						'key': i,
+						'extn_id': extn_val[i],
+						'extn': extn,
+					}
+				)
+
+	@classmethod
+	async def _extend_docs(
+		cls, *, env: Dict[str, Any], extn_targets: List[Dict[str, Any]],
+	):
+		# [DOC] Group extn targets by extn module and second-dimension extn, to read every group at once
+		extn_groups: Dict[Tuple[str, bool], Dict[str, Any]] = {}
+		for extn_target in extn_targets:
+			extn_module, extn_attrs, skip_events = cls._extend_doc_params(
+				doc=extn_target['doc'], attr=extn_target['attr'], extn=extn_target['extn']
+			)
+			extn_target['extn_attrs'] = extn_attrs
+			extn_group_key = (extn_module.module_name, Event.EXTN in skip_events)
+			if extn_group_key not in extn_groups.keys():
+				extn_groups[extn_group_key] = {
+					'module': extn_module,
+					'skip_events': skip_events,
+					'ids': {},
+					'attrs': [],
+					'targets': [],
+				}
+			for attr in extn_attrs.keys():
+				if attr != '_id' and attr not in extn_groups[extn_group_key]['attrs']:
+					extn_groups[extn_group_key]['attrs'].append(attr)
+			extn_groups[extn_group_key]['ids'][
+				str(extn_target['extn_id'])
+			] = extn_target['extn_id']
+			extn_groups[extn_group_key]['targets'].append(extn_target)
+
+		for extn_group in extn_groups.values():
+			extn_module = extn_group['module']
+			extn_models: Dict[str, BaseModel] = {}
+			# [DOC] Only first-dimension extns are cached, as nested extns are not tracked for invalidation
+			extn_cache = (
+				extn_module.extn_cache and Event.EXTN in extn_group['skip_events']
+			)
+			if extn_cache:
+				for extn_id in list(extn_group['ids'].keys()):
+					extn_doc = cls._extn_cache_get(
+						env=env, extn_module=extn_module, extn_id=extn_id
 					)
-				elif type(extn_set['__val']) == list:
-					scope[attr_name] = [
-						await cls._extend_doc(
-							env=env,
-							doc=doc,
-							attr=scope[attr_name],
-							extn_id=extn_id,
-							extn=extn_set['__extn'],
-							extn_models=extn_models,
+					if extn_doc:
+						extn_models[extn_id] = extn_doc
+						del extn_group['ids'][extn_id]
+			if extn_group['ids']:
+				extn_cache_gen = cls._extn_cache_gens.get(extn_module.collection, 0)
+				extn_query = [{'_id': {'$in': list(extn_group['ids'].values())}}]
+				# [DOC] Push extn attrs down to extn module read, unless docs are to be cached in full
+				if not extn_cache and len(extn_group['attrs']) < len(extn_module.attrs):
+					extn_query.append({'$attrs': extn_group['attrs']})
+				# [DOC] Nested extns of extn docs are resolved in same manner by extn module read
+				extn_results = await extn_module.methods['read'](
+					skip_events=extn_group['skip_events'], env=env, query=extn_query,
+				)
+				if extn_results['status'] == 200:
+					for extn_doc in extn_results['args']['docs']:
+						extn_models[str(extn_doc['_id'])] = extn_doc
+						# [DOC] Skip caching docs if collection was updated while reading
+						if extn_cache and extn_cache_gen == cls._extn_cache_gens.get(
+							extn_module.collection, 0
+						):
+							cls._extn_cache_set(
+								env=env, extn_module=extn_module, extn_doc=extn_doc
+							)
+			for extn_target in extn_group['targets']:
+				# [DOC] Set attr to extn_models doc
+				extn_doc = None
+				if str(extn_target['extn_id']) in extn_models.keys():
+					extn_doc = copy.deepcopy(extn_models[str(extn_target['extn_id'])])
+					# [DOC] delete all unneeded keys from the resulted doc
+					extn_doc = BaseModel(
+						{
+							attr: extn_doc[attr]
+							for attr in extn_target['extn_attrs'].keys()
+							if attr in extn_doc
+						}
+					)
+				extn_target['scope'][extn_target['key']] = extn_doc
+
+	@classmethod
+	def _extn_cache_get(
+		cls, *, env: Dict[str, Any], extn_module: Any, extn_id: str
+	) -> Union[None, BaseModel]:
+		extn_cache_key = (extn_module.module_name, extn_id)
+		if extn_cache_key not in cls._extn_cache.keys():
+			cls._extn_cache_stats['misses'] += 1
+			return None
+		extn_cache_entry = cls._extn_cache[extn_cache_key]
+		# [DOC] Check cached doc expiry per module extn_cache period
+		if extn_module.extn_cache.period and (
+			datetime.datetime.utcnow() - extn_cache_entry['cache_time']
+		) > datetime.timedelta(seconds=extn_module.extn_cache.period):
+			cls._extn_cache_pop(extn_cache_key=extn_cache_key)
+			cls._extn_cache_stats['misses'] += 1
+			return None
+		# [DOC] Docs are cached per realm they were read in
+		if extn_cache_entry['realm'] != env.get('realm'):
+			cls._extn_cache_stats['misses'] += 1
+			return None
+		cls._extn_cache.move_to_end(extn_cache_key)
+		cls._extn_cache_stats['hits'] += 1
+		return extn_cache_entry['doc']
+
+	@classmethod
+	def _extn_cache_set(
+		cls, *, env: Dict[str, Any], extn_module: Any, extn_doc: BaseModel
+	):
+		extn_cache_key = (extn_module.module_name, str(extn_doc['_id']))
+		# [DOC] Estimate memory footprint of doc with its JSON representation
+		extn_doc_size = len(JSONEncoder().encode(extn_doc))
+		if extn_doc_size > Config.data_extn_cache_size:
+			return
+		cls._extn_cache_pop(extn_cache_key=extn_cache_key)
+		cls._extn_cache[extn_cache_key] = {
+			'doc': extn_doc,
+			'size': extn_doc_size,
+			'realm': env.get('realm'),
+			'cache_time': datetime.datetime.utcnow(),
+		}
+		cls._extn_cache_size += extn_doc_size
+		while cls._extn_cache_size > Config.data_extn_cache_size:
+			cls._extn_cache_pop(extn_cache_key=next(iter(cls._extn_cache.keys())))
+
+	@classmethod
+	def _extn_cache_pop(cls, *, extn_cache_key: Tuple[str, str]):
+		if extn_cache_key in cls._extn_cache.keys():
+			cls._extn_cache_size -= cls._extn_cache.pop(extn_cache_key)['size']
+
+	@classmethod
+	def extn_cache_invalidate(cls, *, collection: str, docs: List[Any] = None):
+		cls._extn_cache_gens[collection] = cls._extn_cache_gens.get(collection, 0) + 1
+		cls._extn_cache_stats['invalidations'] += 1
+		modules = [
+			module
+			for module in Config.modules.keys()
+			if Config.modules[module].collection == collection
+		]
+		# [DOC] If no docs are passed, drop all cached docs of collection
+		if docs == None:
+			for extn_cache_key in list(cls._extn_cache.keys()):
+				if extn_cache_key[0] in modules:
+					cls._extn_cache_pop(extn_cache_key=extn_cache_key)
+		else:
+			for module in modules:
+				for doc in docs:
+					cls._extn_cache_pop(extn_cache_key=(module, str(doc)))
+
+	@classmethod
+	async def extn_cache_watch(cls, *, env: Dict[str, Any], collection: str):
+		logger.debug(f'Watching collection \'{collection}\' for extn cache invalidation.')
+		try:
+			async with env['conn'][Config.data_name][collection].watch(
+				pipeline=[{'$project': {'operationType': 1, 'documentKey': 1}}]
+			) as stream:
+				async for change in stream:
+					if 'documentKey' in change.keys():
+						cls.extn_cache_invalidate(
+							collection=collection, docs=[change['documentKey']['_id']]
 						)
-						for extn_id in extn_set['__val']
-					]
+					else:
+						cls.extn_cache_invalidate(collection=collection)
+		except Exception as e:
+			logger.warning(
+				f'Failed to watch collection \'{collection}\' for extn cache invalidation. Falling back to local invalidation. Error: {e}'
+			)
+		# [DOC] Changes made by other processes are no longer tracked, drop cached docs of collection
+		cls.extn_cache_invalidate(collection=collection)
 
-		elif type(attr_type._extn) == EXTN:
-			if type(scope[attr_name]) == ObjectId:
-				scope[attr_name] = await cls._extend_doc(
-					env=env,
-					doc=doc,
-					attr=scope[attr_name],
-					extn_id=scope[attr_name],
-					extn=attr_type._extn,
-					extn_models=extn_models,
-				)
-			elif type(scope[attr_name]) == list:
-				scope[attr_name] = [
-					await cls._extend_doc(
-						env=env,
-						doc=doc,
-						attr=scope[attr_name],
-						extn_id=extn_id,
-						extn=attr_type._extn,
-						extn_models=extn_models,
-					)
-					for extn_id in scope[attr_name]
-				]
+	@classmethod
+	def extn_cache_stats(cls) -> Dict[str, int]:
+		return {
+			'size': len(cls._extn_cache),
+			'bytes': cls._extn_cache_size,
+			'max_bytes': Config.data_extn_cache_size,
+			**cls._extn_cache_stats,
+		}
 
 	@classmethod
-	async def _extend_doc(
-		cls,
-		*,
-		env: Dict[str, Any],
-		doc: LIMP_DOC,
-		attr: Union[None, LIMP_DOC],
-		extn_id: ObjectId,
-		extn: EXTN,
-		extn_models: Dict[str, BaseModel] = {},
-	) -> BaseModel:
+	def _extend_doc_params(
+		cls, *, doc: LIMP_DOC, attr: Union[None, LIMP_DOC], extn: EXTN,
+	) -> Tuple[Any, Dict[str, ATTR], List[Event]]:
 		# [DOC] Check if extn module is dynamic value
 		if extn.module.startswith('$__'):
 			extn_module = Config.modules[
@@ -583,6 +1163,8 @@ class Data:
 				extn_attrs = {
 					attr: extn_module.attrs[attr] for attr in extn_module.attrs.keys()
 				}
+			else:
+				extn_attrs = {attr: extn_module.attrs[attr] for attr in extn_attrs}
 		elif extn.attrs[0] == '*':
 			extn_attrs = {
 				attr: extn_module.attrs[attr] for attr in extn_module.attrs.keys()
@@ -597,25 +1179,395 @@ class Data:
 		if extn.force == False:
 			skip_events.append(Event.EXTN)
 		elif type(extn.force) == str and extn.force.startswith('$__'):
-			if not extract_attr(scope={'doc': doc, 'attr': attr}, attr_path=extn.attrs):
+			if not extract_attr(scope={'doc': doc, 'attr': attr}, attr_path=extn.force):
 				skip_events.append(Event.EXTN)
-		# [DOC] Read doc if not in extn_models
-		if str(extn_id) not in extn_models.keys():
-			extn_results = await extn_module.methods['read'](
-				skip_events=skip_events, env=env, query=[{'_id': extn_id}]
-			)
-			if extn_results['args']['count']:
-				extn_models[str(extn_id)] = extn_results['args']['docs'][0]
-			else:
-				extn_models[str(extn_id)] = None
-		# [DOC] Set attr to extn_models doc
-		extn_doc = copy.deepcopy(extn_models[str(extn_id)])
-		# [DOC] delete all unneeded keys from the resulted doc
-		if extn_doc:
-			extn_doc = BaseModel({
-				attr: extn_doc[attr] for attr in extn_attrs.keys() if attr in extn_doc
-			})
-		return extn_doc
+		return (extn_module, extn_attrs, skip_events)
+
+	@classmethod
+	def set_call_ctx(
+		cls,
+		*,
+		module: str,
+		method: str,
+		call_id: str,
+		read_preference: str = None,
+		read_method: bool = True,
+	) -> contextvars.Token:
+		# [DOC] Set calling module, method, call_id for Data calls of current context, to be referenced in slow queries log
+		return cls._call_ctx.set(
+			{
+				'module': module,
+				'method': method,
+				'call_id': call_id,
+				'read_preference': read_preference,
+				'read_method': read_method,
+			}
+		)
+
+	@classmethod
+	def get_call_ctx(cls) -> Dict[str, Any]:
+		return cls._call_ctx.get()
+
+	@classmethod
+	def reset_call_ctx(cls, *, token: contextvars.Token):
+		cls._call_ctx.reset(token)
+
+	@classmethod
+	def _check_slow_query(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		pipeline: List[Any],
+		skip: int,
+		limit: int,
+		sort: Dict[str, int],
+		read_time: float,
+		count: int,
+		total: int,
+	):
+		call_ctx = cls._call_ctx.get() or {
+			'module': None,
+			'method': None,
+			'call_id': None,
+			'read_preference': None,
+			'read_method': True,
+		}
+		# [DOC] Use slow_query_threshold of calling module, if set, otherwise Config.data_slow_query_threshold
+		threshold = Config.data_slow_query_threshold
+		if (
+			call_ctx['module'] in Config.modules.keys()
+			and Config.modules[call_ctx['module']].slow_query_threshold != None
+		):
+			threshold = Config.modules[call_ctx['module']].slow_query_threshold
+		if threshold == None or read_time < threshold:
+			return
+		slow_query = {
+			'create_time': datetime.datetime.utcnow().isoformat(),
+			'collection': collection,
+			**call_ctx,
+			# [DOC] Pipeline is stored as JSON string, as stages keys start with '$'
+			'pipeline': JSONEncoder().encode(pipeline),
+			'skip': skip,
+			'limit': limit,
+			'sort': JSONEncoder().encode(sort),
+			'time': read_time,
+			'count': count,
+			'total': total,
+			'plan': None,
+		}
+		logger.warning(
+			f'Slow query on collection: {collection}, from: {call_ctx["module"]}.{call_ctx["method"]}, call_id: {call_ctx["call_id"]}, time: {read_time}'
+		)
+		asyncio.create_task(
+			cls._log_slow_query(
+				env=env,
+				collection=collection,
+				pipeline=pipeline,
+				slow_query=slow_query,
+				explain=random.random() < Config.data_slow_query_explain,
+			)
+		)
+
+	@classmethod
+	async def _log_slow_query(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		pipeline: List[Any],
+		slow_query: Dict[str, Any],
+		explain: bool,
+	):
+		try:
+			# [DOC] For sampled slow queries, get winning plan of pipeline using explain
+			if explain:
+				explain_results = await env['conn'][Config.data_name].command(
+					'aggregate',
+					collection,
+					pipeline=pipeline,
+					explain=True,
+					allowDiskUse=Config.data_disk_use,
+				)
+				query_planner = None
+				if 'queryPlanner' in explain_results.keys():
+					query_planner = explain_results['queryPlanner']
+				elif 'stages' in explain_results.keys():
+					query_planner = explain_results['stages'][0]['$cursor'][
+						'queryPlanner'
+					]
+				slow_query['plan'] = JSONEncoder().encode(
+					query_planner['winningPlan'] if query_planner else explain_results
+				)
+			await env['conn'][Config.data_name]['__slow_queries'].insert_one(slow_query)
+		except Exception as e:
+			logger.error(f'Failed to log slow query, with error: {e}')
+
+	@classmethod
+	def _read_collection(
+		cls, *, env: Dict[str, Any], collection: str, read_preference: str
+	) -> Any:
+		# [DOC] Reads without read_preference use client default, which is primary
+		if not read_preference or read_preference == 'primary':
+			return env['conn'][Config.data_name][collection]
+		return env['conn'][Config.data_name].get_collection(
+			collection,
+			read_preference=READ_PREFERENCES[read_preference](
+				max_staleness=Config.data_max_staleness
+			),
+		)
+
+	@classmethod
+	def _record_query_shape(
+		cls,
+		*,
+		collection: str,
+		attrs: Dict[str, ATTR],
+		query: Query,
+		sort: Dict[str, int],
+		read_time: float,
+	):
+		# [DOC] Shape of query is its filter attrs split by equality, range opers, sort keys, and $search, $geo_near use
+		eq_attrs = []
+		range_attrs = []
+		for attr, attr_vals in query._index.items():
+			attr_root = attr.split('.')[0]
+			# [DOC] Attrs of extended docs are matched after $lookup stages, which collection indexes can't serve
+			if attr_root != '_id' and (
+				attr_root not in attrs.keys() or attrs[attr_root]._extn
+			):
+				continue
+			# [DOC] ACCESS attrs are matched on their access principals
+			if attr_root in attrs.keys() and attrs[attr_root]._type == 'ACCESS':
+				if collection in cls._access_principals_collections:
+					range_attrs.append(f'__principals.{attr_root}')
+				continue
+			if all(attr_val['oper'] == '$eq' for attr_val in attr_vals):
+				eq_attrs.append(attr)
+			else:
+				range_attrs.append(attr)
+		# [DOC] Only sort keys of known attrs are recorded, so client-supplied keys can't add shapes
+		sort_keys = ()
+		if sort:
+			sort_keys = tuple(
+				(attr, val)
+				for attr, val in sort.items()
+				if attr == '_id'
+				or (attr.split('.')[0] in attrs.keys() and not attrs[attr.split('.')[0]]._extn)
+			)
+		shape = (
+			tuple(sorted(eq_attrs)),
+			tuple(sorted(range_attrs)),
+			sort_keys,
+			'$search' in query,
+			query['$geo_near']['attr'] if '$geo_near' in query else None,
+		)
+		if collection not in cls._query_shapes.keys():
+			cls._query_shapes[collection] = collections.OrderedDict()
+		# [DOC] Shapes are kept in LRU order, capped per collection
+		if shape in cls._query_shapes[collection].keys():
+			cls._query_shapes[collection].move_to_end(shape)
+		else:
+			if len(cls._query_shapes[collection]) >= Config.data_index_advisor_shapes:
+				cls._query_shapes[collection].popitem(last=False)
+			cls._query_shapes[collection][shape] = {
+				'count': 0,
+				'watch_count': 0,
+				'time': 0,
+				'max_time': 0,
+			}
+		shape_stats = cls._query_shapes[collection][shape]
+		# [DOC] Watch queries are counted, but not timed, as change streams can't use collection indexes
+		if read_time == None:
+			shape_stats['watch_count'] += 1
+		else:
+			shape_stats['count'] += 1
+			shape_stats['time'] += read_time
+			shape_stats['max_time'] = max(shape_stats['max_time'], read_time)
+
+	@classmethod
+	def query_shapes(cls) -> Dict[str, List[Dict[str, Any]]]:
+		return {
+			collection: [
+				{
+					'eq': list(shape[0]),
+					'range': list(shape[1]),
+					'sort': dict(shape[2]),
+					'search': shape[3],
+					'geo_near': shape[4],
+					**shape_stats,
+				}
+				for shape, shape_stats in shapes.items()
+			]
+			for collection, shapes in cls._query_shapes.items()
+		}
+
+	@classmethod
+	async def index_advice(cls, *, env: Dict[str, Any]) -> List[Dict[str, Any]]:
+		advice: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
+		for collection, shapes in cls._query_shapes.items():
+			# [DOC] Collect keys of existing indexes, and indexes set in Config.data_indexes
+			indexes_keys = []
+			try:
+				indexes = await env['conn'][Config.data_name][
+					collection
+				].index_information()
+				for index in indexes.values():
+					indexes_keys.append([tuple(key) for key in index['key']])
+			except Exception as e:
+				logger.error(
+					f'Failed to get indexes for collection: {collection}, with error: {e}'
+				)
+			for index in Config.data_indexes:
+				if index['collection'] == collection and type(index['index']) == list:
+					index_keys = [tuple(key) for key in index['index']]
+					if index.get('deleted') == 'compound':
+						index_keys.insert(0, ('__deleted', 1))
+					indexes_keys.append(index_keys)
+
+			for shape, shape_stats in shapes.items():
+				if shape_stats['count'] < Config.data_index_advisor_min_count:
+					continue
+				eq_attrs, range_attrs, sort, search, geo_near = shape
+				# [DOC] $geoNear requires 2dsphere index on geo attr, while $search requires text index
+				if geo_near:
+					candidate_keys = [(geo_near, '2dsphere')]
+				elif search:
+					if any(
+						any(key[1] == 'text' for key in index_keys)
+						for index_keys in indexes_keys
+					):
+						continue
+					candidate_keys = [('$**', 'text')]
+				else:
+					# [DOC] Order candidate keys by equality, sort, range attrs, with __deleted flag matched by every query first
+					candidate_keys = [('__deleted', 1)]
+					candidate_keys += [(attr, 1) for attr in eq_attrs]
+					candidate_keys += [
+						(attr, sort_dir)
+						for attr, sort_dir in sort
+						if attr not in eq_attrs
+					]
+					candidate_keys += [
+						(attr, 1)
+						for attr in range_attrs
+						if attr not in [key[0] for key in candidate_keys]
+					]
+					# [DOC] Queries matching on _id are served by _id index
+					if '_id' in eq_attrs:
+						continue
+				# [DOC] Candidate is covered if it is prefix of existing index, in same or reversed directions
+				reversed_keys = [
+					(key[0], -key[1]) if type(key[1]) == int else key
+					for key in candidate_keys
+				]
+				if any(
+					index_keys[: len(candidate_keys)] in [candidate_keys, reversed_keys]
+					for index_keys in indexes_keys
+				):
+					continue
+				advice_key = (collection, tuple(candidate_keys))
+				if advice_key not in advice.keys():
+					advice[advice_key] = {
+						'collection': collection,
+						'index': candidate_keys,
+						'shapes': 0,
+						'count': 0,
+						'time': 0,
+						'max_time': 0,
+					}
+				advice[advice_key]['shapes'] += 1
+				advice[advice_key]['count'] += shape_stats['count']
+				advice[advice_key]['time'] += shape_stats['time']
+				advice[advice_key]['max_time'] = max(
+					advice[advice_key]['max_time'], shape_stats['max_time']
+				)
+		# [DOC] Rank candidates by estimated benefit, which is total time spent on queries candidate would serve
+		return sorted(advice.values(), key=lambda item: item['time'], reverse=True)
+
+	@classmethod
+	async def index_advisor_create(cls, *, env: Dict[str, Any]):
+		while True:
+			await asyncio.sleep(Config.data_index_advisor_period)
+			try:
+				advice = await cls.index_advice(env=env)
+			except Exception as e:
+				logger.error(f'Failed to get index advice, with error: {e}')
+				continue
+			for item in advice:
+				logger.info(
+					f'Attempting to create advised index for collection: {item["collection"]}, {item["index"]}'
+				)
+				try:
+					await env['conn'][Config.data_name][item['collection']].create_index(
+						item['index'], background=True
+					)
+				except Exception as e:
+					logger.error(
+						f'Failed to create advised index for collection: {item["collection"]}, with error: {e}'
+					)
+
+	@classmethod
+	def _compile_group(
+		cls, *, attrs: Dict[str, ATTR], group_condition: Dict[str, Any]
+	) -> List[Any]:
+		# [DOC] Categories group is top values of attr with their counts, while buckets group splits attr values in ranges
+		if 'type' in group_condition.keys() and group_condition['type'] == 'categories':
+			group_stages = []
+			group_attr = group_condition['by'].split('.')[0]
+			# [DOC] Count every item of list attrs as separate value
+			if group_attr in attrs.keys() and attrs[group_attr]._type == 'LIST':
+				group_stages.append({'$unwind': '$' + group_condition['by']})
+			group_stages += [
+				{'$sortByCount': '$' + group_condition['by']},
+				{'$limit': group_condition['count']},
+			]
+			return group_stages
+		return [
+			{
+				'$bucketAuto': {
+					'groupBy': '$' + group_condition['by'],
+					'buckets': group_condition['count'],
+				}
+			}
+		]
+
+	@classmethod
+	def _process_group(
+		cls, *, group_condition: Dict[str, Any], group_results: List[Dict[str, Any]]
+	) -> List[Dict[str, Any]]:
+		if 'type' in group_condition.keys() and group_condition['type'] == 'categories':
+			return [
+				{'value': group['_id'], 'count': group['count']}
+				for group in group_results
+			]
+		return [
+			{
+				'min': group['_id']['min'],
+				'max': group['_id']['max'],
+				'count': group['count'],
+			}
+			for group in group_results
+		]
+
+	@classmethod
+	def _sort_indexed(cls, *, collection: str, sort: Dict[str, int]) -> bool:
+		# [DOC] Sort is index-backed if by _id only, or by prefix of data index of collection, in same or reversed directions
+		sort_keys = list(sort.items())
+		if [attr for attr, _ in sort_keys] == ['_id']:
+			return True
+		reversed_keys = [(attr, -direction) for attr, direction in sort_keys]
+		for index in Config.data_indexes:
+			if (
+				index['collection'] != collection
+				or type(index['index']) != list
+				or index.get('deleted') == 'compound'
+			):
+				continue
+			index_keys = [tuple(key) for key in index['index'][: len(sort_keys)]]
+			if index_keys in [sort_keys, reversed_keys]:
+				return True
+		return False
 
 	@classmethod
 	async def read(
@@ -627,8 +1579,11 @@ class Data:
 		query: Query,
 		skip_process: bool = False,
 		skip_extn: bool = False,
+		read_preference: str = None,
+		sort_vals: bool = False,
 	) -> Dict[str, Any]:
-		skip, limit, sort, group, aggregate_query = cls._compile_query(
+		read_start = time.monotonic()
+		skip, limit, sort, group, aggregate_query, aggregate_project = cls._compile_query(
 			collection=collection, attrs=attrs, query=query, watch_mode=False
 		)
 
@@ -637,31 +1592,22 @@ class Data:
 			f'skip, limit, sort, group: {skip}, {limit}, {sort}, {group}.'
 		)
 
-		collection = env['conn'][Config.data_name][collection]
-		docs_total_results = collection.aggregate(
-			aggregate_query + [{'$count': '__docs_total'}],
-			allowDiskUse=Config.data_disk_use
+		collection_name = collection
+		collection = cls._read_collection(
+			env=env, collection=collection, read_preference=read_preference
 		)
-		try:
-			async for doc in docs_total_results:
-				docs_total = doc['__docs_total']
-			docs_total
-		except:
-			return {'total': 0, 'count': 0, 'docs': [], 'groups': []}
 
 		groups = {}
+		# [DOC] Groups are computed in one $facet stage, using same pipeline as docs
+		group_facets = {}
 		if group:
 			for group_condition in group:
-				group_query = aggregate_query + [
-					{
-						'$bucketAuto': {
-							'groupBy': '$' + group_condition['by'],
-							'buckets': group_condition['count'],
-						}
-					}
-				]
+				group_stages = cls._compile_group(
+					attrs=attrs, group_condition=group_condition
+				)
+				group_query = aggregate_query + group_stages
 				check_group = False
-				for i in range(len(group_query)):
+				for i in range(len(aggregate_query)):
 					if (
 						list(group_query[i].keys())[0] == '$match'
 						and list(group_query[i]['$match'].keys())[0]
@@ -669,63 +1615,387 @@ class Data:
 					):
 						check_group = True
 						break
+				# [DOC] Groups by attr matched by query are computed without its $match, in separate aggregation
 				if check_group:
 					del group_query[i]
-				group_query = collection.aggregate(group_query, allowDiskUse=Config.data_disk_use)
-				groups[group_condition['by']] = [
+					group_query = collection.aggregate(
+						group_query, allowDiskUse=Config.data_disk_use
+					)
+					groups[group_condition['by']] = cls._process_group(
+						group_condition=group_condition,
+						group_results=[group async for group in group_query],
+					)
+				else:
+					group_facets[f'__group_{len(group_facets)}'] = {
+						'group_condition': group_condition,
+						'stages': group_stages,
+					}
+
+		paging_query = []
+		if skip != None:
+			paging_query.append({'$skip': skip})
+		if limit != None:
+			paging_query.append({'$limit': limit})
+			if sort != None:
+				# [DOC] Add _id as tie-breaker to sort, so every doc has unique position for $after cursor
+				if '_id' not in sort.keys():
+					sort = {**sort, '_id': list(sort.values())[0] if sort else -1}
+				# [DOC] Project sort attrs, so next $after cursor could be worked out of last doc
+				for attr in sort.keys():
+					if attr.split('.')[0] not in aggregate_project[0]['$project'].keys():
+						aggregate_project[0]['$project'][attr.split('.')[0]] = 1
+
+		# [DOC] Work out strategy for total count. Reads using $after cursor skip counting total docs, unless $total is set
+		if '$total' in query:
+			total_strategy = query['$total']
+		elif '$after' in query:
+			total_strategy = 'none'
+		else:
+			total_strategy = Config.data_total
+		total_cap = None
+		if type(total_strategy) == bool:
+			total_strategy = 'exact' if total_strategy else 'none'
+		elif type(total_strategy) == int:
+			total_cap = total_strategy
+			total_strategy = 'capped'
+		elif total_strategy == 'capped':
+			total_cap = Config.data_total_cap
+		# [DOC] estimated_document_count counts all docs of collection, so it is only used with no filter; otherwise fall back to capped
+		if total_strategy == 'estimated' and (
+			query._index or '$search' in query or '$geo_near' in query
+		):
+			total_strategy = 'capped'
+			total_cap = Config.data_total_cap
+		total_query = [{'$count': '__docs_total'}]
+		if total_strategy == 'capped':
+			total_query.insert(0, {'$limit': total_cap})
+
+		facet_read = (
+			Config.data_facet_read
+			and limit != None
+			and '$after' not in query
+			and total_strategy in ['exact', 'capped']
+		)
+
+		# [DOC] If docs are not read using $facet, compute groups in one $facet aggregation of their own
+		if group_facets and not facet_read:
+			group_results = collection.aggregate(
+				aggregate_query
+				+ [
 					{
-						'min': group['_id']['min'],
-						'max': group['_id']['max'],
-						'count': group['count'],
+						'$facet': {
+							group_facet: group_facets[group_facet]['stages']
+							for group_facet in group_facets.keys()
+						}
 					}
-					async for group in group_query
-				]
+				],
+				allowDiskUse=Config.data_disk_use,
+			)
+			async for doc in group_results:
+				for group_facet in group_facets.keys():
+					groups[
+						group_facets[group_facet]['group_condition']['by']
+					] = cls._process_group(
+						group_condition=group_facets[group_facet]['group_condition'],
+						group_results=doc[group_facet],
+					)
+
+		if '$after' in query:
+			aggregate_query.append(
+				{
+					'$match': cls._compile_after_match(
+						sort=sort, after=Query.decode_after(after=query['$after'])
+					)
+				}
+			)
+
+		docs_total = None
+		# [DOC] $facet output is single doc capped at 16MB, use facet read engine for paged reads only
+		if facet_read:
+			facet_query = copy.copy(aggregate_query)
+			docs_query = paging_query + aggregate_project
+			if sort != None:
+				# [DOC] Index-backed sort goes before $facet stage, as sub-pipelines of $facet can't use indexes
+				if cls._sort_indexed(collection=collection_name, sort=sort):
+					facet_query.append({'$sort': sort})
+				# [DOC] Otherwise, sort in __docs sub-pipeline, next to $limit, so only top docs are kept in memory
+				else:
+					docs_query = [{'$sort': sort}] + docs_query
+			facet_query.append(
+				{
+					'$facet': {
+						'__docs_total': total_query,
+						'__docs': docs_query,
+						**{
+							group_facet: group_facets[group_facet]['stages']
+							for group_facet in group_facets.keys()
+						},
+					}
+				}
+			)
+			logger.debug(f'final query: {collection}, {facet_query}.')
+			final_query = facet_query
+
+			facet_results = collection.aggregate(
+				facet_query, allowDiskUse=Config.data_disk_use
+			)
+			docs_total = 0
+			docs = []
+			async for doc in facet_results:
+				if doc['__docs_total']:
+					docs_total = doc['__docs_total'][0]['__docs_total']
+				docs = doc['__docs']
+				for group_facet in group_facets.keys():
+					groups[
+						group_facets[group_facet]['group_condition']['by']
+					] = cls._process_group(
+						group_condition=group_facets[group_facet]['group_condition'],
+						group_results=doc[group_facet],
+					)
+		else:
+			if total_strategy == 'estimated':
+				docs_total = await collection.estimated_document_count()
+			elif total_strategy in ['exact', 'capped']:
+				# [DOC] Total of $after reads is counted without $after cursor $match
+				docs_total_query = aggregate_query
+				if '$after' in query:
+					docs_total_query = aggregate_query[:-1]
+				docs_total_results = collection.aggregate(
+					docs_total_query + total_query,
+					allowDiskUse=Config.data_disk_use
+				)
+				docs_total = 0
+				try:
+					async for doc in docs_total_results:
+						docs_total = doc['__docs_total']
+					docs_total
+				except:
+					return {
+						'total': 0,
+						'total_strategy': total_strategy,
+						'count': 0,
+						'docs': [],
+						'groups': {} if not group else groups,
+						'after': None,
+					}
+
+			if sort != None:
+				aggregate_query.append({'$sort': sort})
+			aggregate_query += paging_query + aggregate_project
+
+			logger.debug(f'final query: {collection}, {aggregate_query}.')
+			final_query = aggregate_query
+
+			docs = await collection.aggregate(
+				aggregate_query, allowDiskUse=Config.data_disk_use
+			).to_list(None)
+
+		read_time = time.monotonic() - read_start
+		if Config.data_index_advisor:
+			cls._record_query_shape(
+				collection=collection_name,
+				attrs=attrs,
+				query=query,
+				sort=sort,
+				read_time=read_time,
+			)
+		cls._check_slow_query(
+			env=env,
+			collection=collection_name,
+			pipeline=final_query,
+			skip=skip,
+			limit=limit,
+			sort=sort,
+			read_time=read_time,
+			count=len(docs),
+			total=docs_total,
+		)
+
+		# [DOC] Work out next $after cursor from last doc, before it gets processed
+		after = None
+		if limit != None and sort != None and len(docs) == limit:
+			after_vals = {}
+			for attr in sort.keys():
+				try:
+					after_vals[attr] = extract_attr(scope=docs[-1], attr_path=f'$__{attr}')
+				except:
+					after_vals[attr] = None
+			after = Query.encode_after(vals=after_vals)
+
+		# [DOC] Raw values of sort attrs are also kept before docs get processed, if required by live window, so docs are compared same as by $sort
+		docs_sort_vals = None
+		if sort_vals:
+			docs_sort_vals = {
+				doc['_id']: cls._doc_sort_vals(doc=doc, sort=sort or {})
+				for doc in docs
+				if doc
+			}
+
+		models = await cls._process_results_docs(
+			env=env,
+			collection=collection,
+			attrs=attrs,
+			query=query,
+			docs=docs,
+			skip_process=skip_process,
+			skip_extn=skip_extn,
+		)
+		return {
+			'total': docs_total,
+			# [DOC] Strategy used to count total. With capped strategy, total equal to cap means there are more docs
+			'total_strategy': total_strategy,
+			# [DOC] Count of docs in page is worked out from returned docs, rather than separate $count
+			'count': len(docs),
+			'docs': models,
+			'groups': {} if not group else groups,
+			'after': after,
+			**({'sort_vals': docs_sort_vals} if sort_vals else {}),
+		}
 
+	@classmethod
+	def _doc_sort_vals(
+		cls, *, doc: LIMP_DOC, sort: Dict[str, int]
+	) -> Dict[str, Any]:
+		sort_vals = {}
+		for attr in sort.keys():
+			val = doc
+			for attr_path in attr.split('.'):
+				val = val.get(attr_path) if type(val) == dict else None
+			sort_vals[attr] = val
+		return sort_vals
+
+	@classmethod
+	async def read_stream(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		attrs: Dict[str, ATTR],
+		query: Query,
+		batch_size: int,
+		skip_extn: bool = False,
+		read_preference: str = None,
+	) -> Dict[str, Any]:
+		skip, limit, sort, group, aggregate_query, aggregate_project = cls._compile_query(
+			collection=collection, attrs=attrs, query=query, watch_mode=False
+		)
+
+		collection = cls._read_collection(
+			env=env, collection=collection, read_preference=read_preference
+		)
+
+		if '$after' in query:
+			aggregate_query.append(
+				{
+					'$match': cls._compile_after_match(
+						sort=sort, after=Query.decode_after(after=query['$after'])
+					)
+				}
+			)
 		if sort != None:
 			aggregate_query.append({'$sort': sort})
 		if skip != None:
 			aggregate_query.append({'$skip': skip})
 		if limit != None:
 			aggregate_query.append({'$limit': limit})
+		aggregate_query += aggregate_project
 
-		logger.debug(f'final query: {collection}, {aggregate_query}.')
+		logger.debug(f'final stream query: {collection}, {aggregate_query}.')
 
-		docs_count_results = collection.aggregate(
-			aggregate_query + [{'$count': '__docs_count'}],
-			allowDiskUse=Config.data_disk_use
-		)
-		try:
-			async for doc in docs_count_results:
-				docs_count = doc['__docs_count']
-			docs_count
-		except:
-			return {
-				'total': docs_total,
-				'count': 0,
-				'docs': [],
-				'groups': {} if not group else groups,
+		# [DOC] Docs are pulled from cursor, processed and yielded in batches, rather than read at once
+		docs = []
+		async for doc in collection.aggregate(
+			aggregate_query, allowDiskUse=Config.data_disk_use, batchSize=batch_size
+		):
+			docs.append(doc)
+			if len(docs) == batch_size:
+				yield {
+					'count': len(docs),
+					'docs': await cls._process_results_docs(
+						env=env,
+						collection=collection,
+						attrs=attrs,
+						query=query,
+						docs=docs,
+						skip_extn=skip_extn,
+					),
+				}
+				docs = []
+		if docs:
+			yield {
+				'count': len(docs),
+				'docs': await cls._process_results_docs(
+					env=env,
+					collection=collection,
+					attrs=attrs,
+					query=query,
+					docs=docs,
+					skip_extn=skip_extn,
+				),
 			}
-		docs = collection.aggregate(aggregate_query, allowDiskUse=Config.data_disk_use)
+
+	@classmethod
+	async def _process_results_docs(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		attrs: Dict[str, ATTR],
+		query: Query,
+		docs: List[LIMP_DOC],
+		skip_process: bool = False,
+		skip_extn: bool = False,
+	) -> List[BaseModel]:
+		# [DOC] Process only attrs selected by $attrs, as other attrs are not projected
+		if '$attrs' in query and type(query['$attrs']) == list:
+			attrs = {attr: attrs[attr] for attr in query['$attrs'] if attr in attrs.keys()}
+
 		models = []
-		extn_models = {}
-		async for doc in docs:
-			if not skip_process:
-				doc = await cls._process_results_doc(
+		extn_targets = []
+		if not skip_process:
+			for doc in docs:
+				await cls._process_results_doc(
 					env=env,
 					collection=collection,
 					attrs=attrs,
 					doc=doc,
-					extn_models=extn_models,
+					extn_targets=extn_targets,
 					skip_extn=skip_extn,
 				)
+			# [DOC] Resolve extns of all docs in one read per extn module
+			await cls._extend_docs(env=env, extn_targets=extn_targets)
+		for doc in docs:
 			if doc:
 				models.append(BaseModel(doc))
-		return {
-			'total': docs_total,
-			'count': docs_count,
-			'docs': models,
-			'groups': {} if not group else groups,
-		}
+		return models
+
+	@classmethod
+	def _compile_after_match(
+		cls, *, sort: Dict[str, int], after: Dict[str, Any]
+	) -> Dict[str, Any]:
+		# [DOC] Match docs positioned after cursor, comparing sort attrs in order
+		after_match = {'$or': []}
+		sort_attrs = list(sort.keys())
+		for i in range(len(sort_attrs)):
+			after_step = {
+				attr: after[attr] if attr in after.keys() else None
+				for attr in sort_attrs[:i]
+			}
+			attr = sort_attrs[i]
+			after_val = after[attr] if attr in after.keys() else None
+			# [DOC] Null, missing values sort before all others, so comparison oper can't be used with them
+			if after_val == None:
+				if sort[attr] == -1:
+					continue
+				after_step[attr] = {'$ne': None}
+			elif sort[attr] == 1:
+				after_step[attr] = {'$gt': after_val}
+			elif attr == '_id':
+				after_step[attr] = {'$lt': after_val}
+			else:
+				after_step['$or'] = [{attr: {'$lt': after_val}}, {attr: None}]
+			after_match['$or'].append(after_step)
+		return after_match
 
 	@classmethod
 	async def watch(
@@ -736,42 +2006,972 @@ class Data:
 		attrs: Dict[str, ATTR],
 		query: Query,
 		skip_extn: bool = False,
+		read_preference: str = None,
+		live: Dict[str, int] = None,
 	) -> Dict[str, Any]:
-		aggregate_query = cls._compile_query(
+		aggregate_query, watch_project = cls._compile_query(
 			collection=collection, attrs=attrs, query=query, watch_mode=True
-		)[4]
+		)[4:]
 
-		collection = env['conn'][Config.data_name][collection]
+		# [DOC] Live watch receives all changes of collection flagged with match, so docs leaving query are detected
+		if live:
+			if cls._match_supported(pipeline=aggregate_query):
+				watch_project = []
+			else:
+				logger.warning(
+					'Live watch query can\'t be matched in-process. Docs leaving query would not be detected.'
+				)
+				live = None
+
+		# [DOC] Only requested attrs are processed, extended, if watch is projected
+		if watch_project:
+			attrs = {
+				attr: attrs[attr] for attr in query['$attrs'] if attr in attrs.keys()
+			}
+
+		resume_token = None
+		if '$resume' in query:
+			resume_token = Query.decode_resume(resume=query['$resume'])
+
+		# [DOC] Delta watch sends changed attrs of update events only, with doc version
+		delta = '$delta' in query and query['$delta'] == True and not live
+		if delta and watch_project:
+			watch_project[0]['$project']['fullDocument.__version'] = 1
+
+		if Config.data_index_advisor:
+			cls._record_query_shape(
+				collection=collection, attrs=attrs, query=query, sort=None, read_time=None
+			)
+
+		# [DOC] Projected watch matches update events in-process, so updateLookup can be skipped if updateDescription has all required attrs
+		lookup_attrs = None
+		if watch_project and cls._match_supported(pipeline=aggregate_query):
+			lookup_attrs = set()
+			for stage in aggregate_query:
+				lookup_attrs.update(cls._match_attrs(match=stage['$match']))
+			# [DOC] Delta watch requires only changed attrs, which are added per update event
+			if not delta:
+				lookup_attrs.update(attrs.keys())
+
+		# [DOC] Subscribe to shared change stream of collection, if watch pipeline can be matched in-process. Resumed watches replay from own stream
+		if (
+			Config.data_watch_shared
+			and not resume_token
+			and cls._match_supported(pipeline=aggregate_query)
+		):
+			watch = cls._watch_subscribe(
+				env=env,
+				collection=collection,
+				attrs=attrs,
+				pipeline=aggregate_query,
+				skip_extn=skip_extn,
+				project=bool(watch_project),
+				delta=delta,
+				live=live,
+				lookup_attrs=lookup_attrs,
+				read_preference=read_preference,
+			)
+			try:
+				# [DOC] Stream is signalled only once shared change stream is open, so reads following it miss no change
+				await watch.opened.wait()
+				yield {'stream': watch}
+				while True:
+					results = await watch.queue.get()
+					if results == None:
+						break
+					yield results
+			finally:
+				cls._watch_unsubscribe(watch=watch)
+			logger.debug('Shared changeStream subscriber ended. Generator ended at Data')
+			return
+
+		collection = cls._read_collection(
+			env=env, collection=collection, read_preference=read_preference
+		)
+
+		stream_pipeline = aggregate_query + watch_project
+		full_document = 'updateLookup'
+		if live:
+			stream_pipeline = []
+		elif lookup_attrs != None:
+			stream_pipeline = [
+				{
+					'$match': {
+						'$or': [
+							{'operationType': 'update'},
+							{'$and': [stage['$match'] for stage in aggregate_query]},
+						]
+					}
+				}
+			] + watch_project
+			full_document = 'default'
 
 		logger.debug('Preparing generator at Data')
-		async with collection.watch(
-			pipeline=aggregate_query, full_document='updateLookup'
-		) as stream:
-			yield {'stream': stream}
-			async for change in stream:
-				logger.debug(f'Detected change at Data: {change}')
-
-				oper = change['operationType']
-				if oper in ['insert', 'replace', 'update']:
-					if oper == 'insert':
-						oper = 'create'
-					elif oper == 'replace':
-						oper = 'update'
-					doc = await cls._process_results_doc(
-						env=env,
-						collection=collection,
-						attrs=attrs,
-						doc=change['fullDocument'],
-						skip_extn=skip_extn,
-					)
-					model = BaseModel(doc)
-				elif oper == 'delete':
-					model = BaseModel({'_id': change['documentKey']['_id']})
+		retries = 0
+		lookup_count = 0
+		start_time = None
+		while True:
+			lookup_fallback = False
+			try:
+				if not resume_token and not start_time:
+					start_time = await cls._watch_start_time(collection=collection)
+				async with collection.watch(
+					pipeline=stream_pipeline,
+					full_document=full_document,
+					resume_after=resume_token,
+					start_at_operation_time=None if resume_token else start_time,
+				) as stream:
+					yield {'stream': stream}
+					async for change in stream:
+						logger.debug(f'Detected change at Data: {change}')
+						retries = 0
 
-				yield {'count': 1, 'oper': oper, 'docs': [model]}
+						if change['operationType'] == 'update' and lookup_attrs != None:
+							change_lookup_attrs = lookup_attrs
+							if delta:
+								change_lookup_attrs = lookup_attrs | cls._delta_lookup_attrs(
+									change=change, attrs=attrs
+								)
+							if not change_lookup_attrs.issubset(
+								cls._watch_changed_attrs(change=change)
+							):
+								lookup_count += 1
+							elif lookup_count:
+								lookup_count -= 1
+							# [DOC] Lookups are bound. Once they outnumber updates covered by updateDescription, stream is resumed with updateLookup
+							if resume_token and lookup_count > Config.data_watch_lookup_limit:
+								logger.debug(
+									'Update events mostly require lookup. Resuming changeStream with updateLookup.'
+								)
+								lookup_attrs = None
+								stream_pipeline = aggregate_query + watch_project
+								full_document = 'updateLookup'
+								lookup_fallback = True
+								break
+							change['fullDocument'] = await cls._watch_update_doc(
+								collection=collection,
+								change=change,
+								lookup_attrs=change_lookup_attrs,
+							)
+							if not change['fullDocument'] or not all(
+								cls._match_doc(doc=change, match=stage['$match'])
+								for stage in aggregate_query
+							):
+								resume_token = change['_id']
+								continue
+						resume_token = change['_id']
+						if change['operationType'] not in ['insert', 'replace', 'update', 'delete']:
+							continue
+						# [DOC] Live watch is sent _id of changed doc no longer matching query, so it's removed from window
+						if live and not cls._live_match(
+							change=change, pipeline=aggregate_query
+						):
+							yield {
+								'count': 1,
+								'oper': 'delete'
+								if change['operationType'] == 'delete'
+								else 'update',
+								'docs': [BaseModel({'_id': change['documentKey']['_id']})],
+								'match': False,
+								'resume': Query.encode_resume(token=resume_token),
+							}
+							continue
+						oper, doc = await cls._watch_change_doc(
+							env=env,
+							collection=collection,
+							attrs=attrs,
+							change=change,
+							skip_extn=skip_extn,
+							project=bool(watch_project),
+							delta=delta,
+						)
+						if not doc:
+							continue
+						model = BaseModel(doc)
+
+						results = {
+							'count': 1,
+							'oper': oper,
+							'docs': [model],
+							'resume': Query.encode_resume(token=resume_token),
+						}
+						if live:
+							results['match'] = True
+							results['sort_vals'] = {
+								doc['_id']: cls._doc_sort_vals(
+									doc=change['fullDocument'], sort=live
+								)
+							}
+						yield results
+				if lookup_fallback:
+					continue
+				break
+			except PyMongoError as e:
+				if resume_token and getattr(e, 'code', None) in CHANGE_STREAM_HISTORY_LOST_CODES:
+					# [DOC] Events since resume token are lost, signal full resync and watch from now
+					logger.warning('Resume token is no longer in oplog. Signalling resync.')
+					resume_token = None
+					start_time = None
+					yield {'resync': True}
+				elif retries < Config.data_watch_retries:
+					retries += 1
+					logger.warning(
+						f'changeStream failed, with error: {e}. Resuming, attempt {retries}.'
+					)
+					await asyncio.sleep(retries)
+				else:
+					raise
 
 		logger.debug('changeStream has been close. Generator ended at Data')
 
+	@classmethod
+	def _watch_subscribe(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		attrs: Dict[str, ATTR],
+		pipeline: List[Dict[str, Any]],
+		skip_extn: bool,
+		project: bool,
+		delta: bool,
+		live: Union[Dict[str, int], None],
+		lookup_attrs: Union[Set[str], None],
+		read_preference: str,
+	) -> DataWatch:
+		stream_key = (collection, read_preference or 'primary')
+		watch = DataWatch(
+			env=env,
+			stream_key=stream_key,
+			pipeline=pipeline,
+			attrs=attrs,
+			skip_extn=skip_extn,
+			project=project,
+			delta=delta,
+			live=live,
+			lookup_attrs=lookup_attrs,
+		)
+		# [DOC] Open one change stream per collection, read preference, shared by all subscribers. Stream holds no env, as docs are processed with env of every subscriber
+		if stream_key not in cls._watch_streams.keys():
+			logger.debug(f'Opening shared changeStream for: {stream_key}')
+			cls._watch_streams[stream_key] = {
+				'subscribers': [],
+				'task': None,
+				'open': False,
+			}
+			cls._watch_streams[stream_key]['task'] = asyncio.create_task(
+				cls._watch_stream(
+					collection=cls._read_collection(
+						env=env, collection=collection, read_preference=read_preference
+					),
+					stream_key=stream_key,
+				)
+			)
+		cls._watch_streams[stream_key]['subscribers'].append(watch)
+		if cls._watch_streams[stream_key]['open']:
+			watch.opened.set()
+		return watch
+
+	@classmethod
+	def _watch_unsubscribe(cls, *, watch: DataWatch):
+		if watch.stream_key not in cls._watch_streams.keys():
+			return
+		watch_stream = cls._watch_streams[watch.stream_key]
+		if watch in watch_stream['subscribers']:
+			watch_stream['subscribers'].remove(watch)
+		# [DOC] Close shared change stream once last subscriber leaves
+		if not watch_stream['subscribers']:
+			logger.debug(f'Closing shared changeStream for: {watch.stream_key}')
+			watch_stream['task'].cancel()
+			del cls._watch_streams[watch.stream_key]
+
+	@classmethod
+	async def _watch_stream(cls, *, collection: Any, stream_key: Tuple[str, str]):
+		watch_stream = cls._watch_streams[stream_key]
+		resume_token = None
+		retries = 0
+		# [DOC] Shared stream skips updateLookup as dedicated stream does, looking up update events only if updateDescription lacks attrs required by any subscriber
+		full_document = 'default'
+		lookup_count = 0
+		start_time = None
+		while True:
+			lookup_fallback = False
+			try:
+				if not resume_token and not start_time:
+					start_time = await cls._watch_start_time(collection=collection)
+				async with collection.watch(
+					pipeline=[],
+					full_document=full_document,
+					resume_after=resume_token,
+					start_at_operation_time=None if resume_token else start_time,
+				) as stream:
+					# [DOC] Signal subscribers waiting for stream to open, so they don't read ahead of it
+					watch_stream['open'] = True
+					for watch in list(watch_stream['subscribers']):
+						watch.opened.set()
+					async for change in stream:
+						logger.debug(f'Detected change at shared changeStream: {change}')
+						retries = 0
+						oper = change['operationType']
+						if oper == 'update' and full_document == 'default':
+							lookup_attrs = cls._watch_stream_lookup_attrs(
+								change=change, subscribers=watch_stream['subscribers']
+							)
+							if lookup_attrs == None or not lookup_attrs.issubset(
+								cls._watch_changed_attrs(change=change)
+							):
+								lookup_count += 1
+							elif lookup_count:
+								lookup_count -= 1
+							# [DOC] Lookups are bound. Once they outnumber updates covered by updateDescription, stream is resumed with updateLookup
+							if resume_token and lookup_count > Config.data_watch_lookup_limit:
+								logger.debug(
+									f'Update events of shared changeStream for: {stream_key} mostly require lookup. Resuming with updateLookup.'
+								)
+								full_document = 'updateLookup'
+								lookup_fallback = True
+								break
+							change['fullDocument'] = await cls._watch_update_doc(
+								collection=collection, change=change, lookup_attrs=lookup_attrs
+							)
+						resume_token = change['_id']
+						if oper not in ['insert', 'replace', 'update', 'delete']:
+							continue
+						if oper != 'delete' and not change.get('fullDocument'):
+							continue
+						# [DOC] Change doc is processed, extended once for all subscribers sharing attrs, realm, session
+						processed_docs = {}
+						for watch in list(watch_stream['subscribers']):
+							if watch.live:
+								if not cls._live_match(change=change, pipeline=watch.pipeline):
+									watch.queue.put_nowait(
+										{
+											'count': 1,
+											'oper': 'delete' if oper == 'delete' else 'update',
+											'docs': [BaseModel({'_id': change['documentKey']['_id']})],
+											'match': False,
+											'resume': Query.encode_resume(token=resume_token),
+										}
+									)
+									continue
+							elif not all(
+								cls._match_doc(doc=change, match=stage['$match'])
+								for stage in watch.pipeline
+							):
+								continue
+							# [DOC] Extn docs are read skipping PERM event, so processed doc only differs by realm, attrs, processing flags
+							process_key = (
+								watch.env.get('realm'),
+								tuple((attr, id(watch.attrs[attr])) for attr in watch.attrs),
+								watch.project,
+								watch.delta,
+								watch.skip_extn,
+							)
+							if process_key not in processed_docs.keys():
+								doc_oper, doc = await cls._watch_change_doc(
+									env=watch.env,
+									collection=collection,
+									attrs=watch.attrs,
+									change=change,
+									skip_extn=watch.skip_extn,
+									project=watch.project,
+									delta=watch.delta,
+								)
+								# [DOC] Model, and its encoding, are shared by subscribers. Subscribers with hooks that could change docs copy them
+								model = BaseModel(doc) if doc else None
+								processed_docs[process_key] = (
+									doc_oper,
+									model,
+									JSONEncoder().encode([model]) if model else None,
+								)
+							doc_oper, model, docs_encoded = processed_docs[process_key]
+							if not model:
+								continue
+							results = {
+								'count': 1,
+								'oper': doc_oper,
+								'docs': [model],
+								'resume': Query.encode_resume(token=resume_token),
+								'__docs_encoded': docs_encoded,
+							}
+							if watch.live:
+								results['match'] = True
+								results['sort_vals'] = {
+									model._id: cls._doc_sort_vals(
+										doc=change['fullDocument'], sort=watch.live
+									)
+								}
+							watch.queue.put_nowait(results)
+				if lookup_fallback:
+					continue
+				break
+			except asyncio.CancelledError:
+				raise
+			except PyMongoError as e:
+				watch_stream['open'] = False
+				if resume_token and getattr(e, 'code', None) in CHANGE_STREAM_HISTORY_LOST_CODES:
+					# [DOC] Events since last token are lost, signal subscribers to resync
+					logger.warning(
+						f'Shared changeStream for: {stream_key} lost resume token. Signalling resync.'
+					)
+					resume_token = None
+					start_time = None
+					for watch in list(watch_stream['subscribers']):
+						watch.queue.put_nowait({'resync': True})
+				elif retries < Config.data_watch_retries:
+					retries += 1
+					logger.warning(
+						f'Shared changeStream for: {stream_key} failed, with error: {e}. Resuming, attempt {retries}.'
+					)
+					await asyncio.sleep(retries)
+				else:
+					logger.error(
+						f'Shared changeStream for: {stream_key} failed, with error: {e}'
+					)
+					break
+			except Exception as e:
+				logger.error(f'Shared changeStream for: {stream_key} failed, with error: {e}')
+				break
+		# [DOC] End generators of all subscribers, if shared change stream is no longer available
+		for watch in list(watch_stream['subscribers']):
+			watch.opened.set()
+			watch.queue.put_nowait(None)
+		if cls._watch_streams.get(stream_key) == watch_stream:
+			del cls._watch_streams[stream_key]
+
+	@classmethod
+	async def _watch_start_time(
+		cls, *, collection: 'AsyncIOMotorCollection'
+	) -> Union[Timestamp, None]:
+		# [DOC] Change stream cursor is only created on first iteration. Stream is opened at operation time read before it, so changes following reads signalled by stream are not missed
+		results = await collection.database.command(
+			'ping', read_preference=collection.read_preference
+		)
+		return results.get('operationTime')
+
+	@classmethod
+	def _live_match(
+		cls, *, change: Dict[str, Any], pipeline: List[Dict[str, Any]]
+	) -> bool:
+		# [DOC] Deleted, soft-deleted docs no longer match live query
+		if change['operationType'] == 'delete' or not change.get('fullDocument'):
+			return False
+		if change['fullDocument'].get('__deleted') == True:
+			return False
+		return all(
+			cls._match_doc(doc=change, match=stage['$match']) for stage in pipeline
+		)
+
+	@classmethod
+	async def _watch_change_doc(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: 'AsyncIOMotorCollection',
+		attrs: Dict[str, ATTR],
+		change: Dict[str, Any],
+		skip_extn: bool,
+		project: bool,
+		delta: bool,
+	) -> Tuple[str, Union[LIMP_DOC, None]]:
+		oper = change['operationType']
+		if oper == 'delete':
+			return ('delete', {'_id': change['documentKey']['_id']})
+		oper = 'create' if oper == 'insert' else 'update'
+		doc = change.get('fullDocument') or {}
+		version = None
+		if delta:
+			version = doc.get('__version', 0)
+			if change['operationType'] == 'update':
+				update_description = change.get('updateDescription') or {}
+				updated_fields = update_description.get('updatedFields') or {}
+				# [DOC] Soft delete is sent to delta watch as delete event, as doc is no longer readable
+				if updated_fields.get('__deleted') == True:
+					return ('delete', {'_id': change['documentKey']['_id']})
+				version = updated_fields.get('__version', version)
+				doc = cls._watch_delta_doc(change=change, attrs=attrs)
+				if not doc:
+					return (oper, None)
+				attrs = {attr: attrs[attr] for attr in attrs.keys() if attr in doc.keys()}
+		# [DOC] Doc was deleted before updateLookup
+		if not doc:
+			return (oper, None)
+		if project or delta:
+			doc = {
+				attr: doc[attr]
+				for attr in ['_id', '__unset', *attrs.keys()]
+				if attr in doc.keys()
+			}
+		doc = await cls._process_results_doc(
+			env=env,
+			collection=collection,
+			attrs=attrs,
+			doc=copy.deepcopy(doc),
+			skip_extn=skip_extn,
+		)
+		if delta:
+			doc['__version'] = version
+		return (oper, doc)
+
+	@classmethod
+	def _watch_delta_doc(
+		cls, *, change: Dict[str, Any], attrs: Dict[str, ATTR]
+	) -> Union[LIMP_DOC, None]:
+		update_description = change.get('updateDescription') or {}
+		updated_fields = update_description.get('updatedFields') or {}
+		removed_fields = update_description.get('removedFields') or []
+		full_doc = change.get('fullDocument') or {}
+		delta_doc = {'_id': change['documentKey']['_id']}
+		unset_attrs = []
+		for field in [*updated_fields.keys(), *removed_fields]:
+			attr = field.split('.')[0]
+			if attr not in attrs.keys() or attr in delta_doc.keys() or attr in unset_attrs:
+				continue
+			if field in updated_fields.keys() and '.' not in field:
+				delta_doc[attr] = updated_fields[field]
+			elif '.' not in field:
+				unset_attrs.append(attr)
+			# [DOC] Partial update of attr is sent as whole attr value, so LOCALE, EXTN rules apply as for full doc
+			elif attr in full_doc.keys():
+				delta_doc[attr] = full_doc[attr]
+		if unset_attrs:
+			delta_doc['__unset'] = unset_attrs
+		if len(delta_doc.keys()) == 1:
+			return None
+		return delta_doc
+
+	@classmethod
+	def _delta_lookup_attrs(
+		cls, *, change: Dict[str, Any], attrs: Dict[str, ATTR]
+	) -> Set[str]:
+		# [DOC] Attrs partially updated by change, which delta watch has to lookup whole
+		update_description = change.get('updateDescription') or {}
+		updated_fields = update_description.get('updatedFields') or {}
+		return {
+			field.split('.')[0]
+			for field in updated_fields.keys()
+			if '.' in field and field.split('.')[0] in attrs.keys()
+		}
+
+	@classmethod
+	def _watch_stream_lookup_attrs(
+		cls, *, change: Dict[str, Any], subscribers: List[DataWatch]
+	) -> Union[Set[str], None]:
+		# [DOC] Attrs required by all subscribers of shared stream for update event, or None if any requires full doc
+		lookup_attrs = set()
+		for watch in subscribers:
+			if watch.lookup_attrs == None:
+				return None
+			lookup_attrs.update(watch.lookup_attrs)
+			if watch.delta:
+				lookup_attrs.update(cls._delta_lookup_attrs(change=change, attrs=watch.attrs))
+		return lookup_attrs
+
+	@classmethod
+	def _watch_changed_attrs(cls, *, change: Dict[str, Any]) -> Set[str]:
+		update_description = change.get('updateDescription') or {}
+		updated_fields = update_description.get('updatedFields') or {}
+		removed_fields = update_description.get('removedFields') or []
+		# [DOC] Dotted paths only update part of attr value, so they can't be used as whole attr
+		return {
+			attr for attr in [*updated_fields.keys(), *removed_fields] if '.' not in attr
+		}
+
+	@classmethod
+	async def _watch_update_doc(
+		cls,
+		*,
+		collection: 'AsyncIOMotorCollection',
+		change: Dict[str, Any],
+		lookup_attrs: Union[Set[str], None],
+	) -> LIMP_DOC:
+		update_description = change.get('updateDescription') or {}
+		updated_fields = update_description.get('updatedFields') or {}
+		if lookup_attrs != None and lookup_attrs.issubset(
+			cls._watch_changed_attrs(change=change)
+		):
+			return {
+				'_id': change['documentKey']['_id'],
+				**{
+					attr: updated_fields[attr]
+					for attr in lookup_attrs
+					if attr in updated_fields.keys()
+				},
+			}
+		# [DOC] Lookup doc, projected to required attrs only, if updateDescription is not enough. Lookup is on primary with majority read concern, so it's not staler than change
+		logger.debug(f'Looking up doc for change: {change["_id"]}')
+		collection = collection.with_options(
+			read_preference=Primary(), read_concern=ReadConcern('majority')
+		)
+		# [DOC] Lookup of full doc, if required, matches updateLookup
+		projection = None
+		if lookup_attrs != None:
+			projection = {'_id': 1, **{attr: 1 for attr in lookup_attrs}}
+		return await collection.find_one(
+			{'_id': change['documentKey']['_id']}, projection=projection
+		)
+
+	@classmethod
+	def _match_attrs(cls, *, match: Dict[str, Any]) -> Set[str]:
+		# [DOC] Return doc attrs referenced by change stream match
+		match_attrs = set()
+		for key, val in match.items():
+			if key in ['$and', '$or', '$nor']:
+				for child_match in val:
+					match_attrs.update(cls._match_attrs(match=child_match))
+			elif key.startswith('fullDocument.'):
+				match_attrs.add(key.split('.')[1])
+		return match_attrs
+
+	@classmethod
+	def _match_supported(cls, *, pipeline: List[Dict[str, Any]]) -> bool:
+		# [DOC] Only $match stages, with opers implemented by _match_doc, can be matched in-process
+		def match_supported(match: Dict[str, Any]) -> bool:
+			for key, val in match.items():
+				if key in ['$and', '$or', '$nor']:
+					if not all(match_supported(child_match) for child_match in val):
+						return False
+				elif key[0] == '$':
+					return False
+				elif (
+					type(val) == dict
+					and val
+					and all(oper[0] == '$' for oper in val.keys())
+					and not set(val.keys()).issubset(MATCH_OPERS)
+				):
+					return False
+			return True
+
+		return all(
+			list(stage.keys()) == ['$match'] and match_supported(stage['$match'])
+			for stage in pipeline
+		)
+
+	@classmethod
+	def _match_vals(cls, *, doc: Any, path: List[str]) -> List[Any]:
+		if not path:
+			# [DOC] List value is matched as whole, as well as by its items
+			if type(doc) == list:
+				return [doc, *doc]
+			return [doc]
+		if type(doc) == dict:
+			if path[0] not in doc.keys():
+				return []
+			return cls._match_vals(doc=doc[path[0]], path=path[1:])
+		if type(doc) == list:
+			vals = []
+			if path[0].isdigit() and int(path[0]) < len(doc):
+				vals += cls._match_vals(doc=doc[int(path[0])], path=path[1:])
+			for item in doc:
+				if type(item) == dict:
+					vals += cls._match_vals(doc=item, path=path)
+			return vals
+		return []
+
+	@classmethod
+	def _match_doc(cls, *, doc: Dict[str, Any], match: Dict[str, Any]) -> bool:
+		for key, cond in match.items():
+			if key == '$and':
+				if not all(cls._match_doc(doc=doc, match=child) for child in cond):
+					return False
+			elif key == '$or':
+				if not any(cls._match_doc(doc=doc, match=child) for child in cond):
+					return False
+			elif key == '$nor':
+				if any(cls._match_doc(doc=doc, match=child) for child in cond):
+					return False
+			elif not cls._match_cond(
+				vals=cls._match_vals(doc=doc, path=key.split('.')), cond=cond
+			):
+				return False
+		return True
+
+	@classmethod
+	def _match_cond(cls, *, vals: List[Any], cond: Any) -> bool:
+		def compare(val: Any, oper: str, cond_val: Any) -> bool:
+			try:
+				if oper == '$gt':
+					return val > cond_val
+				elif oper == '$gte':
+					return val >= cond_val
+				elif oper == '$lt':
+					return val < cond_val
+				elif oper == '$lte':
+					return val <= cond_val
+			except TypeError:
+				return False
+
+		def regex(val: Any, pattern: Any, options: str = '') -> bool:
+			if type(val) != str:
+				return False
+			if type(pattern) == str:
+				pattern = re.compile(
+					pattern, re.RegexFlag.IGNORECASE if 'i' in options else 0
+				)
+			return bool(pattern.search(val))
+
+		if type(cond) == re.Pattern:
+			return any(regex(val, cond) for val in vals)
+		if not (
+			type(cond) == dict
+			and cond
+			and all(oper[0] == '$' for oper in cond.keys())
+		):
+			# [DOC] Match None as missing value, as Mongo does
+			if cond == None and not vals:
+				return True
+			return any(val == cond for val in vals)
+		for oper, cond_val in cond.items():
+			if oper == '$eq':
+				if not cls._match_cond(vals=vals, cond=cond_val):
+					return False
+			elif oper == '$ne':
+				if cls._match_cond(vals=vals, cond=cond_val):
+					return False
+			elif oper in ['$gt', '$gte', '$lt', '$lte']:
+				if not any(compare(val, oper, cond_val) for val in vals):
+					return False
+			elif oper == '$in':
+				if not any(
+					cls._match_cond(vals=vals, cond=child_val) for child_val in cond_val
+				):
+					return False
+			elif oper == '$nin':
+				if any(
+					cls._match_cond(vals=vals, cond=child_val) for child_val in cond_val
+				):
+					return False
+			elif oper == '$all':
+				if not all(
+					cls._match_cond(vals=vals, cond=child_val) for child_val in cond_val
+				):
+					return False
+			elif oper == '$exists':
+				if bool(vals) != bool(cond_val):
+					return False
+			elif oper == '$regex':
+				if not any(
+					regex(val, cond_val, cond.get('$options', '')) for val in vals
+				):
+					return False
+		return True
+
+	@classmethod
+	def _access_attrs(cls, *, attrs: Dict[str, ATTR]) -> List[str]:
+		return [attr for attr in attrs.keys() if attrs[attr]._type == 'ACCESS']
+
+	@classmethod
+	def _access_principals_doc(
+		cls, *, attrs: Dict[str, ATTR], doc: LIMP_DOC
+	) -> Dict[str, Any]:
+		# [DOC] Access principals are denormalised into multikey array of 'anon', 'user:<id>', 'group:<id>' of every ACCESS attr
+		access_attrs = cls._access_attrs(attrs=attrs)
+		if not access_attrs:
+			return {}
+		access_principals = {}
+		for attr in access_attrs:
+			principals = []
+			if 'user' in doc.keys() and doc['user']:
+				principals.append(f'user:{doc["user"]}')
+			if attr in doc.keys() and type(doc[attr]) == dict:
+				if doc[attr].get('anon') == True:
+					principals.append('anon')
+				principals += [f'user:{user}' for user in doc[attr].get('users', [])]
+				principals += [
+					f'group:{group}' for group in doc[attr].get('groups', [])
+				]
+			access_principals[attr] = principals
+		return {'__principals': access_principals}
+
+	@classmethod
+	def _compile_access_principals(cls, *, attrs: Dict[str, ATTR]) -> List[Any]:
+		# [DOC] Update pipeline to work out access principals of docs out of stored values
+		return [
+			{
+				'$set': {
+					f'__principals.{attr}': {
+						'$concatArrays': [
+							{
+								'$cond': [
+									{'$ifNull': ['$user', False]},
+									[{'$concat': ['user:', {'$toString': '$user'}]}],
+									[],
+								]
+							},
+							{'$cond': [{'$eq': [f'${attr}.anon', True]}, ['anon'], []]},
+							{
+								'$map': {
+									'input': {'$ifNull': [f'${attr}.users', []]},
+									'in': {'$concat': ['user:', {'$toString': '$$this'}]},
+								}
+							},
+							{
+								'$map': {
+									'input': {'$ifNull': [f'${attr}.groups', []]},
+									'in': {'$concat': ['group:', {'$toString': '$$this'}]},
+								}
+							},
+						]
+					}
+					for attr in cls._access_attrs(attrs=attrs)
+				}
+			}
+		]
+
+	@classmethod
+	def _update_access_principals(
+		cls, *, attrs: Dict[str, ATTR], doc: LIMP_DOC
+	) -> bool:
+		# [DOC] Access principals are worked out again if update touches any ACCESS attr, or owner user
+		access_attrs = cls._access_attrs(attrs=attrs)
+		return bool(access_attrs) and any(
+			attr.split('.')[0] in [*access_attrs, 'user'] for attr in doc.keys()
+		)
+
+	@classmethod
+	def _compile_update_pipeline(
+		cls, *, attrs: Dict[str, ATTR], update_doc: Dict[str, Any]
+	) -> List[Dict[str, Any]]:
+		# [DOC] Convert update doc into update pipeline ending with access principals stages, so both are written in one atomic update
+		def path_expr(path: List[str], base: Any, val_expr: Any) -> Any:
+			if not path:
+				return val_expr(base)
+			if path[0].isdigit():
+				index = int(path[0])
+				return {
+					'$concatArrays': [
+						{'$slice': [{'$ifNull': [base, []]}, index]},
+						[
+							path_expr(
+								path[1:], {'$arrayElemAt': [base, index]}, val_expr
+							)
+						],
+						{'$slice': [{'$ifNull': [base, []]}, index + 1, 2 ** 31 - 1]},
+					]
+				}
+			return {
+				'$mergeObjects': [
+					{'$ifNull': [base, {}]},
+					{
+						path[0]: path_expr(
+							path[1:],
+							{'$let': {'vars': {'base': base}, 'in': f'$$base.{path[0]}'}},
+							val_expr,
+						)
+					},
+				]
+			}
+
+		val_exprs = {
+			'$set': lambda val: lambda cur: {'$literal': val},
+			'$inc': lambda val: lambda cur: {'$add': [{'$ifNull': [cur, 0]}, val]},
+			'$mul': lambda val: lambda cur: {'$multiply': [{'$ifNull': [cur, 0]}, val]},
+			'$push': lambda val: lambda cur: {
+				'$concatArrays': [{'$ifNull': [cur, []]}, [{'$literal': val}]]
+			},
+			'$addToSet': lambda val: lambda cur: {
+				'$cond': [
+					{'$in': [{'$literal': val}, {'$ifNull': [cur, []]}]},
+					{'$ifNull': [cur, []]},
+					{'$concatArrays': [{'$ifNull': [cur, []]}, [{'$literal': val}]]},
+				]
+			},
+			'$pullAll': lambda val: lambda cur: {
+				'$filter': {
+					'input': {'$ifNull': [cur, []]},
+					'cond': {'$not': [{'$in': ['$$this', {'$literal': val}]}]},
+				}
+			},
+		}
+		update_pipeline = []
+		for oper in update_doc.keys():
+			for attr, val in update_doc[oper].items():
+				# [DOC] Every attr is set in own stage, so opers on same root attr don't clash
+				path = attr.split('.')
+				update_pipeline.append(
+					{
+						'$set': {
+							path[0]: path_expr(
+								path[1:], f'${path[0]}', val_exprs[oper](val)
+							)
+						}
+					}
+				)
+		return update_pipeline + cls._compile_access_principals(attrs=attrs)
+
+	@classmethod
+	async def migrate_access_principals(
+		cls, *, env: Dict[str, Any], collection: str, attrs: Dict[str, ATTR]
+	):
+		# [DOC] Backfill access principals for docs created before they were set
+		migrations = env['conn'][Config.data_name]['__migrations']
+		migration_id = f'access_principals:{collection}'
+		migration = await migrations.find_one({'_id': migration_id})
+		if not migration or not migration['done']:
+			logger.debug(
+				f'Attempting to migrate access principals for collection: {collection}'
+			)
+			try:
+				await env['conn'][Config.data_name][collection].update_many(
+					{'__principals': {'$exists': False}},
+					cls._compile_access_principals(attrs=attrs),
+				)
+			except Exception as e:
+				logger.error(
+					f'Failed to migrate access principals for collection: {collection}, with error: {e}'
+				)
+				return
+			await migrations.update_one(
+				{'_id': migration_id}, {'$set': {'done': True}}, upsert=True
+			)
+			logger.debug(f'Migrated access principals for collection: {collection}')
+		if collection not in cls._access_principals_collections:
+			cls._access_principals_collections.append(collection)
+
+	@classmethod
+	async def migrate_deleted_flag(cls, *, env: Dict[str, Any], collection: str):
+		# [DOC] Backfill __deleted flag for docs created before it was always set. Progress is stored, so migration resumes after restarts
+		migrations = env['conn'][Config.data_name]['__migrations']
+		migration_id = f'deleted_flag:{collection}'
+		migration = await migrations.find_one({'_id': migration_id})
+		if migration and migration['done']:
+			return
+		last_id = migration['last_id'] if migration else None
+		logger.debug(
+			f'Attempting to migrate \'__deleted\' flag for collection: {collection}, from: {last_id}'
+		)
+		migrate_collection = env['conn'][Config.data_name][collection]
+		try:
+			while True:
+				batch_query = {'_id': {'$gt': last_id}} if last_id != None else {}
+				batch = [
+					doc['_id']
+					async for doc in migrate_collection.find(batch_query, {'_id': 1})
+					.sort('_id', 1)
+					.limit(Config.data_deleted_flag_batch)
+				]
+				if not batch:
+					break
+				await migrate_collection.update_many(
+					{'_id': {'$in': batch}, '__deleted': {'$exists': False}},
+					{'$set': {'__deleted': False}},
+				)
+				last_id = batch[-1]
+				await migrations.update_one(
+					{'_id': migration_id},
+					{'$set': {'last_id': last_id, 'done': False}},
+					upsert=True,
+				)
+		except Exception as e:
+			logger.error(
+				f'Failed to migrate \'__deleted\' flag for collection: {collection}, with error: {e}'
+			)
+			return
+		await migrations.update_one(
+			{'_id': migration_id}, {'$set': {'done': True}}, upsert=True
+		)
+		logger.debug(f'Migrated \'__deleted\' flag for collection: {collection}')
+
 	@classmethod
 	async def create(
 		cls,
@@ -782,25 +2982,58 @@ class Data:
 		doc: LIMP_DOC,
 	) -> Dict[str, Any]:
 		collection = env['conn'][Config.data_name][collection]
-		results = await collection.insert_one(doc)
+		results = await collection.insert_one(
+			{
+				**doc,
+				'__deleted': False,
+				**cls._access_principals_doc(attrs=attrs, doc=doc),
+			}
+		)
 		_id = results.inserted_id
 		return {'count': 1, 'docs': [BaseModel({'_id': _id})]}
 
 	@classmethod
-	async def update(
+	async def create_many(
 		cls,
 		*,
 		env: Dict[str, Any],
 		collection: str,
 		attrs: Dict[str, ATTR],
-		docs: List[str],
-		doc: LIMP_DOC,
+		docs: List[LIMP_DOC],
 	) -> Dict[str, Any]:
-		# [DOC] Recreate docs list by converting all docs items to ObjectId
-		docs = [ObjectId(doc) for doc in docs]
-		# [DOC] Perform update query on matching docs
 		collection = env['conn'][Config.data_name][collection]
-		results = None
+		# [DOC] Set _id for docs ahead of insert, so ids are known for inserted docs if some docs fail
+		for doc in docs:
+			if '_id' not in doc.keys():
+				doc['_id'] = ObjectId()
+		errors: Dict[int, str] = {}
+		try:
+			await collection.insert_many(
+				[
+					{
+						**doc,
+						'__deleted': False,
+						**cls._access_principals_doc(attrs=attrs, doc=doc),
+					}
+					for doc in docs
+				],
+				ordered=False,
+			)
+		except BulkWriteError as e:
+			for write_error in e.details['writeErrors']:
+				errors[write_error['index']] = write_error['errmsg']
+		return {
+			'count': len(docs) - len(errors),
+			'docs': [
+				BaseModel({'_id': docs[i]['_id']})
+				for i in range(len(docs))
+				if i not in errors.keys()
+			],
+			'errors': errors,
+		}
+
+	@classmethod
+	def _compile_update_doc(cls, *, doc: LIMP_DOC) -> Dict[str, Any]:
 		doc = copy.deepcopy(doc)
 		update_doc = {'$set': doc}
 		# [DOC] Check for increament oper
@@ -840,18 +3073,268 @@ class Data:
 			del doc[del_attr]
 		if not len(list(update_doc['$set'].keys())):
 			del update_doc['$set']
+		# [DOC] Bump doc version, so delta watch subscribers can spot missed updates
+		if '$inc' not in update_doc.keys():
+			update_doc['$inc'] = {}
+		update_doc['$inc']['__version'] = 1
+		return update_doc
+
+	@classmethod
+	def _compile_update_guard(
+		cls, *, update_doc: Dict[str, Any]
+	) -> Union[Dict[str, Any], None]:
+		# [DOC] Filter matching docs update would change, so no-op updates don't bump __version, or count as modified. None if any oper always changes doc
+		guard = []
+		for oper in update_doc.keys():
+			for attr, val in update_doc[oper].items():
+				if oper == '$inc' and attr == '__version':
+					continue
+				elif (
+					oper == '$set'
+					and not any(path.isdigit() for path in attr.split('.'))
+				):
+					guard.append({'$expr': {'$ne': [f'${attr}', {'$literal': val}]}})
+				elif oper == '$addToSet' and type(val) != list:
+					guard.append({attr: {'$ne': val}})
+				elif oper == '$pullAll':
+					guard.append({attr: {'$in': val}})
+				else:
+					return None
+		if not guard:
+			return None
+		return {'$or': guard}
+
+	@classmethod
+	async def _azure_backoff(cls, *, attempt: int):
+		await asyncio.sleep(min(0.1 * 2 ** attempt, 5) * (1 + random.random()))
+
+	@classmethod
+	async def _azure_write(
+		cls,
+		*,
+		collection: Any,
+		ops: List[Tuple[Dict[str, Any], Union[Dict[str, Any], None]]],
+	) -> int:
+		# [DOC] ops are (filter, update_doc) tuples, with update_doc None for delete ops
+		if not ops:
+			return 0
+		write_count = 0
+		if Config.data_azure_mongo_bulk:
+			# [DOC] Send ops in one unordered bulk_write, retrying only throttled ops with backoff
+			pending_ops = ops
+			failed_count = 0
+			for attempt in range(Config.data_azure_mongo_retries + 1):
+				if attempt:
+					await cls._azure_backoff(attempt=attempt)
+				try:
+					results = await collection.bulk_write(
+						[
+							UpdateOne(op_filter, op_doc)
+							if op_doc != None
+							else DeleteOne(op_filter)
+							for op_filter, op_doc in pending_ops
+						],
+						ordered=False,
+					)
+					write_count += results.modified_count + results.deleted_count
+					pending_ops = []
+				except BulkWriteError as e:
+					write_count += e.details['nModified'] + e.details['nRemoved']
+					throttled_ops = []
+					for write_error in e.details['writeErrors']:
+						if write_error['code'] in AZURE_THROTTLE_CODES:
+							throttled_ops.append(pending_ops[write_error['index']])
+						else:
+							logger.error(f'Failed to write op: {write_error}')
+							failed_count += 1
+					pending_ops = throttled_ops
+				except OperationFailure as e:
+					if e.code not in AZURE_THROTTLE_CODES:
+						raise e
+				if not pending_ops:
+					break
+			failed_count += len(pending_ops)
+			if failed_count:
+				raise AzureWriteException(
+					f'Failed to write {failed_count} of {len(ops)} ops, {len(pending_ops)} of which due to throttling after {Config.data_azure_mongo_retries} retries.'
+				)
+			return write_count
+
+		# [DOC] Without bulk_write, write ops concurrently, bounded by semaphore
+		semaphore = asyncio.Semaphore(Config.data_azure_mongo_concurrency)
+
+		async def write_op(
+			op_filter: Dict[str, Any], op_doc: Union[Dict[str, Any], None]
+		) -> int:
+			async with semaphore:
+				for attempt in range(Config.data_azure_mongo_retries + 1):
+					if attempt:
+						await cls._azure_backoff(attempt=attempt)
+					try:
+						if op_doc != None:
+							results = await collection.update_one(op_filter, op_doc)
+							return results.modified_count
+						else:
+							results = await collection.delete_one(op_filter)
+							return results.deleted_count
+					except OperationFailure as e:
+						if (
+							e.code not in AZURE_THROTTLE_CODES
+							or attempt == Config.data_azure_mongo_retries
+						):
+							raise e
+
+		for op_count in await asyncio.gather(
+			*[write_op(op_filter, op_doc) for op_filter, op_doc in ops]
+		):
+			write_count += op_count
+		return write_count
+
+	@classmethod
+	async def update(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		attrs: Dict[str, ATTR],
+		docs: List[str],
+		doc: LIMP_DOC,
+	) -> Dict[str, Any]:
+		# [DOC] Recreate docs list by converting all docs items to ObjectId
+		docs = [ObjectId(doc) for doc in docs]
+		# [DOC] Perform update query on matching docs
+		collection = env['conn'][Config.data_name][collection]
+		results = None
+		update_doc = cls._compile_update_doc(doc=doc)
+		update_guard = cls._compile_update_guard(update_doc=update_doc)
+		if cls._update_access_principals(attrs=attrs, doc=doc):
+			update_doc = cls._compile_update_pipeline(
+				attrs=attrs, update_doc=update_doc
+			)
 		logger.debug(f'Final update doc: {update_doc}')
-		# [DOC] If using Azure Mongo service update docs one by one
+
+		def update_filter(docs_filter: Dict[str, Any]) -> Dict[str, Any]:
+			if not update_guard:
+				return docs_filter
+			return {'$and': [docs_filter, update_guard]}
+
+		# [DOC] If using Azure Mongo service update docs by _id
 		if Config.data_azure_mongo:
-			update_count = 0
-			for _id in docs:
-				results = await collection.update_one({'_id': _id}, update_doc)
-				update_count += results.modified_count
+			update_count = await cls._azure_write(
+				collection=collection,
+				ops=[(update_filter({'_id': _id}), update_doc) for _id in docs],
+			)
 		else:
-			results = await collection.update_many({'_id': {'$in': docs}}, update_doc)
+			results = await collection.update_many(
+				update_filter({'_id': {'$in': docs}}), update_doc
+			)
 			update_count = results.modified_count
 		return {'count': update_count, 'docs': [{'_id': doc} for doc in docs]}
 
+	@classmethod
+	def _query_single_id(cls, *, query: Query) -> Union[str, ObjectId, None]:
+		# [DOC] Return _id value of query matching one doc by top-level scalar _id equality. OR lists, $in, list values match more docs
+		if '_id' not in query._index.keys() or len(query._index['_id']) != 1:
+			return None
+		id_index = query._index['_id'][0]
+		if (
+			id_index['oper'] != '$eq'
+			or len(id_index['path']) != 1
+			or type(id_index['val']) not in [str, ObjectId]
+		):
+			return None
+		return id_index['val']
+
+	@classmethod
+	def _compile_update_filter(
+		cls, *, collection: str, attrs: Dict[str, ATTR], query: Query
+	) -> Union[Dict[str, Any], None]:
+		_, _, _, _, aggregate_query, _ = cls._compile_query(
+			collection=collection, attrs=attrs, query=query, watch_mode=False
+		)
+		# [DOC] Update filters can only express $match stages. Queries requiring lookups return None
+		if any(list(stage.keys()) != ['$match'] for stage in aggregate_query):
+			return None
+		update_filter = [stage['$match'] for stage in aggregate_query]
+		if len(update_filter) == 1:
+			return update_filter[0]
+		return {'$and': update_filter}
+
+	@classmethod
+	async def update_many(
+		cls,
+		*,
+		env: Dict[str, Any],
+		collection: str,
+		attrs: Dict[str, ATTR],
+		updates: List[Dict[str, Any]],
+	) -> Dict[str, Any]:
+		collection_name = collection
+		collection = env['conn'][Config.data_name][collection]
+		update_ops: List[Union[UpdateOne, UpdateMany]] = []
+		# [DOC] Index of update of every op, as guarded updates take two ops
+		ops_updates: List[int] = []
+		for i, update in enumerate(updates):
+			update_doc = cls._compile_update_doc(doc=update['doc'])
+			update_guard = cls._compile_update_guard(update_doc=update_doc)
+			if cls._update_access_principals(attrs=attrs, doc=update['doc']):
+				update_doc = cls._compile_update_pipeline(
+					attrs=attrs, update_doc=update_doc
+				)
+			update_filter = cls._compile_update_filter(
+				collection=collection_name, attrs=attrs, query=update['query']
+			)
+			if update_filter == None:
+				# [DOC] Resolve matching docs _id values ahead of bulk_write for queries with lookups
+				read_query = Query(update['query'])
+				read_query.append({'$attrs': []})
+				docs_results = await cls.read(
+					env=env,
+					collection=collection_name,
+					attrs=attrs,
+					query=read_query,
+					skip_process=True,
+				)
+				update_filter = {
+					'_id': {'$in': [doc._id for doc in docs_results['docs']]}
+				}
+			# [DOC] Query with single _id value matches at most one doc
+			update_op = (
+				UpdateOne
+				if cls._query_single_id(query=update['query']) != None
+				else UpdateMany
+			)
+			if update_guard:
+				update_ops.append(
+					update_op({'$and': [update_filter, update_guard]}, update_doc)
+				)
+				# [DOC] Docs update leaves unchanged are still counted as matched, with no-op $setOnInsert
+				update_ops.append(
+					update_op(
+						{'$and': [update_filter, {'$nor': [update_guard]}]},
+						{'$setOnInsert': {'__version': 0}},
+					)
+				)
+				ops_updates += [i, i]
+			else:
+				update_ops.append(update_op(update_filter, update_doc))
+				ops_updates.append(i)
+		logger.debug(f'Final update ops: {update_ops}')
+		errors: Dict[int, str] = {}
+		if not update_ops:
+			return {'count': 0, 'matched': 0, 'errors': errors}
+		# [DOC] Send all update ops in one unordered bulk_write, so failing ops don't block rest of ops
+		try:
+			results = await collection.bulk_write(update_ops, ordered=False)
+			update_count = results.modified_count
+			match_count = results.matched_count
+		except BulkWriteError as e:
+			for write_error in e.details['writeErrors']:
+				errors[ops_updates[write_error['index']]] = write_error['errmsg']
+			update_count = e.details['nModified']
+			match_count = e.details['nMatched']
+		return {'count': update_count, 'matched': match_count, 'errors': errors}
+
 	@classmethod
 	async def delete(
 		cls,
@@ -880,15 +3363,15 @@ class Data:
 			# [DOC] Perform update call on matching docs
 			collection = env['conn'][Config.data_name][collection]
 			update_doc = {'$set': {'__deleted': True}}
-			# [DOC] If using Azure Mongo service update docs one by one
+			# [DOC] If using Azure Mongo service update docs by _id
 			if Config.data_azure_mongo:
-				update_count = 0
-				for _id in docs:
-					results = await collection.update_one({'_id': _id}, update_doc)
-					update_count += results.modified_count
+				update_count = await cls._azure_write(
+					collection=collection,
+					ops=[({'_id': _id}, update_doc) for _id in del_docs],
+				)
 			else:
 				results = await collection.update_many(
-					{'_id': {'$in': docs}}, update_doc
+					{'_id': {'$in': del_docs}}, update_doc
 				)
 				update_count = results.modified_count
 			return {'count': update_count, 'docs': [{'_id': doc} for doc in docs]}
@@ -911,10 +3394,10 @@ class Data:
 			# [DOC] Perform delete query on matching docs
 			collection = env['conn'][Config.data_name][collection]
 			if Config.data_azure_mongo:
-				delete_count = 0
-				for _id in del_docs:
-					results = await collection.delete_one({'_id': _id})
-					delete_count += results.deleted_count
+				delete_count = await cls._azure_write(
+					collection=collection,
+					ops=[({'_id': _id}, None) for _id in del_docs],
+				)
 			else:
 				results = await collection.delete_many({'_id': {'$in': del_docs}})
 				delete_count = results.deleted_count
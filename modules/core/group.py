@@ -1,5 +1,5 @@
 from base_module import BaseModule
-from classes import ATTR, PERM
+from classes import ATTR, PERM, EXTN_CACHE
 from config import Config
 from enums import Event
 
@@ -26,6 +26,7 @@ class Group(BaseModule):
 		'privileges': {},
 		'settings': {},
 	}
+	extn_cache = EXTN_CACHE()
 	methods = {
 		'read': {'permissions': [PERM(privilege='admin')]},
 		'create': {'permissions': [PERM(privilege='admin')]},
@@ -0,0 +1,32 @@
+from base_module import BaseModule
+from classes import PERM
+from data import Data
+
+
+class Monitor(BaseModule):
+	'''`Monitor` module provides stats of data layer, such as connections pool and caches, for monitoring LIMP apps. The module has no collection, and its methods are available for ADMIN only.'''
+	methods = {
+		'stats': {'permissions': [PERM(privilege='admin')], 'get_method': True},
+		'index_advice': {'permissions': [PERM(privilege='admin')], 'get_method': True},
+	}
+
+	async def stats(self, skip_events=[], env={}, query=[], doc={}):
+		return self.status(
+			status=200,
+			msg='Data stats.',
+			args={
+				'conn': Data.conn_stats(),
+				'query_cache': Data.query_cache_stats(),
+				'extn_cache': Data.extn_cache_stats(),
+			},
+		)
+
+	async def index_advice(self, skip_events=[], env={}, query=[], doc={}):
+		return self.status(
+			status=200,
+			msg='Data index advice.',
+			args={
+				'shapes': Data.query_shapes(),
+				'advice': await Data.index_advice(env=env),
+			},
+		)
@@ -1,6 +1,6 @@
 from base_module import BaseModule
 from enums import Event
-from classes import ATTR, PERM, EXTN
+from classes import ATTR, PERM, EXTN, EXTN_CACHE
 from config import Config
 
 from bson import ObjectId
@@ -15,6 +15,7 @@ class Realm(BaseModule):
 		'default': ATTR.ID(desc='`_id` of `Group` doc that serves as `DEFAULT` group of the realm.'),
 		'create_time': ATTR.DATETIME(desc='Python `datetime` ISO format of the doc creation.'),
 	}
+	extn_cache = EXTN_CACHE()
 	methods = {
 		'read': {'permissions': [PERM(privilege='read')]},
 		'create': {'permissions': [PERM(privilege='create')]},
@@ -81,7 +81,9 @@ class User(BaseModule):
 			user = results['docs'][i]
 			user['settings'] = {}
 			for auth_attr in Config.user_auth_attrs:
-				del user[f'{auth_attr}_hash']
+				# [DOC] Hash attrs are not present if excluded by $attrs
+				if f'{auth_attr}_hash' in user._attrs().keys():
+					del user[f'{auth_attr}_hash']
 			if len(Config.user_doc_settings):
 				setting_results = await Config.modules['setting'].read(
 					skip_events=[Event.PERM, Event.ARGS],